@@ -9,100 +9,127 @@ from discord.ext.commands import Bot
 from discord.ext.commands import command
 from discord.ext.commands import bot_has_permissions
 from discord.ext import commands as c
-from aiohttp import ClientSession
+from aiohttp import ClientTimeout, ClientError
 import wordsDict
-import requests
 import time
 import platform
 import minesweeper
+import hangman
+import infostore
 import secret
+import admins
+import escalation
+import ratelimit
+import regexpool
+import wikicache
+import paging
+import projectpool
+import router
+import scratchusers
+import translations
+import sessions
+import botlog
+from metrics import METRICS
+from outbound import OUTBOUND
+from transport import TRANSPORT
 import threading
 import os
 
-global ALERT_USERS
-ALERT_USERS={}
-global WARNING_USERS
-WARNING_USERS={}
 async def bMsg(ctx,user,client):
-    logger.info('Block Checker:'+user, extra={'invoker': ctx.message.author.name})
-    if secret.isBlocked(user):
+    logger.info('Block Checker:%s', user, extra=botlog.context(ctx))
+    if secret.isBlocked(user) or secret.isLegacyBlocked(ctx.author.name):
         if ctx.author.dm_channel is None:
             await ctx.author.create_dm()
         await ctx.author.dm_channel.send("You have been blocked! Please send apple502j DM if you want to be unblocked.")
         await ctx.message.delete()
-        logger.info('Blocked:'+user, extra={'invoker': ctx.message.author.name})
+        logger.info('Blocked:%s', user, extra=botlog.context(ctx))
         return True
     else:
         return False
 
 async def alertMsg(ctx,user,reason,client):
-    global ALERT_USERS
-    logger.info('Alert:'+user+' Reason:'+reason, extra={'invoker': ctx.message.author.name})
+    logger.info('Alert:%s Reason:%s', user, reason, extra=botlog.context(ctx))
     if ctx.author.dm_channel is None:
             await ctx.author.create_dm()
     await ctx.author.dm_channel.send("Alert:"+reason)
     secret.setWarnType(user,"alert")
-    if user not in ALERT_USERS.keys():
-        ALERT_USERS[user] = 1
-    elif ALERT_USERS[user] == 2:
+    if await ESCALATION.bump(user,"alerts") >= 3:
         secret.setWarnType(user,"block")
-        ALERT_USERS[user] = 0
-    else:
-        ALERT_USERS[user] = ALERT_USERS[user] + 1
+        await ESCALATION.reset(user,"alerts")
 
 async def warnMsg(ctx,user,reason,client):
-    global WARNING_USERS
-    global ALERT_USERS
-    if user in ALERT_USERS.keys():
+    if await ESCALATION.get(user,"alerts"):
         await alertMsg(ctx,user,reason,client)
-    logger.info('Warning:'+user+' Reason:'+reason, extra={'invoker': ctx.message.author.name})
+    logger.info('Warning:%s Reason:%s', user, reason, extra=botlog.context(ctx))
     if ctx.author.dm_channel is None:
             await ctx.author.create_dm()
     await ctx.author.dm_channel.send("Warning:"+reason)
     secret.setWarnType(user,"warning")
-    if user not in WARNING_USERS.keys():
-        WARNING_USERS[user] = 1
-    elif WARNING_USERS[user] == 2:
+    if await ESCALATION.bump(user,"warnings") >= 3:
         await alertMsg(ctx,user,reason,client)
-        WARNING_USERS[user] = 0
-    else:
-        WARNING_USERS[user] = WARNING_USERS[user] + 1
+        await ESCALATION.reset(user,"warnings")
         
-logfmt = logging.Formatter(
-    fmt='{asctime} {invoker}: {message}',
-    datefmt='%Y-%m-%dT%H:%M:%SZ',
-    style='{'
-)
-
-class CustomHandler(logging.Handler):
-    def emit(self, record):
-        print(self.format(record))
-
-handler = CustomHandler()
-handler.setFormatter(logfmt)
-
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
-logger.addHandler(handler)
 
-secret.clearAllWarnings()
+class Kenny2automate(Bot):
+    async def close(self):
+        await TRANSPORT.close()
+        await super().close()
+
+client = Kenny2automate(description="A testing Discord bot.", command_prefix="$")
 
-client = Bot(description="A testing Discord bot.", command_prefix="$")
+#shared budgets for each upstream API, plus one per user for translations
+WIKI_LIMIT = ratelimit.Limiter(10, 10, 'command')
+SCRATCH_LIMIT = ratelimit.Limiter(10, 10, 'command')
+TRANSLATE_LIMIT = ratelimit.Limiter(5, 10, 'command')
+TRANSLATE_USER_LIMIT = ratelimit.Limiter(1, 20)
+
+@client.event
+async def on_command_error(ctx, error):
+    if isinstance(error, ratelimit.RateLimited):
+        await ctx.send(str(error))
+        #only for the invoker's own budget; shared ones run dry through others' use
+        if error.byUser:
+            await warnMsg(ctx,ctx.author.id,"Please don't use commands so quickly.",client)
+        return
+    if isinstance(getattr(error, 'original', None), sessions.SessionTimeout):
+        await ctx.send(str(error.original))
+        return
+    if hasattr(ctx.command, 'on_error'):
+        return
+    logger.error('Ignoring exception in command %s', ctx.command,
+                 exc_info=(type(error), error, error.__traceback__),
+                 extra=botlog.context(ctx))
+
+async def flushBlocklist(interval=5.0):
+    """Write-behind for the blocklist: journal queued changes off the loop."""
+    while True:
+        await a.sleep(interval)
+        try:
+            await client.loop.run_in_executor(None, secret.BLOCKLIST.flush)
+        except a.CancelledError:
+            raise
+        except Exception:
+            #the changes stay queued for the next try
+            logger.exception('Blocklist flush failed')
 
 @client.command()
-async def ban(msg,whotoban):
+async def ban(msg,whotoban: d.User):
     if msg.author.name != "apple502j":
         pass
     else:
-        secret.setWarnType(whotoban,"block")
+        secret.setWarnType(whotoban.id,"block")
+        secret.forgetName(whotoban.name)
     await msg.delete()
 
 @client.command()
-async def unban(msg,whotounban):
+async def unban(msg,whotounban: d.User):
     if msg.author.name != "apple502j":
         pass
     else:
-        secret.setWarnType(whotounban,"block",remove=True)
+        secret.setWarnType(whotounban.id,"block",remove=True)
+        secret.forgetName(whotounban.name)
     await msg.delete()
 
 
@@ -122,15 +149,15 @@ async def clear(ctx):
 @client.command()
 async def botinfo(ctx,infonum):
     """ Bot Info """
-    try:
-        info_txt_f=open(os.getcwd() + "\\info\\" + infonum + ".txt","r")
-    except:
+    info = INFO.get(infonum)
+    if info is None:
         await ctx.send("botinfo -1: I can't find the file!")
         return
-    await ctx.send(info_txt_f.read())
-    info_txt_f.close()
+    await OUTBOUND.send_many(ctx, [info])
+
 
 
+REGEX_POOL = regexpool.RegexPool()
 
 class Regexes(object):
     """Regex commands - Python flavored."""
@@ -138,46 +165,39 @@ class Regexes(object):
         self.bot = bot
 
     @command()
+    @ratelimit.limit(ratelimit.Limiter(5, 10))
     async def search(self, ctx, pattern, string, flags=None):
         """Make a Python-flavored regex search! All groups are shown."""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Regexes.search: \"' + '\" \"'.join((pattern, string, flags)) + '\"', extra={'invoker': ctx.message.author.name})
-        if flags is not None:
-            exp = '(?' + flags.lower().replace('l', 'L') + ')(?:' + pattern + ')'
-        else:
-            exp = pattern
+        logger.info('Regexes.search: "%s" "%s" %s', pattern, string, flags, extra=botlog.context(ctx))
         try:
-            m = re.search(exp, string)
-        except Exception:
-            m = False
-        if m:
-            result = '```\nGroups:\n' + m.group(0) + '\n'
-            for group in m.groups():
-                result += (group or '') + '\n'
-            result += '```'
-        elif m is False:
+            m = await REGEX_POOL.run('search', pattern, string, flags)
+        except regexpool.RegexTimeout:
+            result = '```\nThe expression took too long.\n```'
+        except regexpool.RegexError:
             result = '```\nError in flags or expression.\n```'
         else:
-            result = '```\nNo match :(\n```'
+            if m:
+                result = '```\nGroups:\n' + '\n'.join(m) + '\n```'
+            else:
+                result = '```\nNo match :(\n```'
         await ctx.send(result)
 
     @command()
+    @ratelimit.limit(ratelimit.Limiter(5, 10))
     async def findall(self, ctx, pattern, string, flags=None):
         """Use a Python-flavor regex to find all occurences of a pattern!"""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Regexes.findall: \"' + '\" \"'.join((pattern, string, flags)) + '\"', extra={'invoker': ctx.message.author.name})
-        if flags is not None:
-            exp = '(?' + flags.lower().replace('l', 'L') + ')(?:' + pattern + ')'
-        else:
-            exp = pattern
-        gen = re.finditer(exp, string)
+        logger.info('Regexes.findall: "%s" "%s" %s', pattern, string, flags, extra=botlog.context(ctx))
         result = '```\nResults:\n'
         try:
-            for m in gen:
-                result += m.group(0) + ('\t' if len(m.groups()) > 0 else '') + '\t'.join(m.groups()) + '\n'
-        except Exception:
+            for m in await REGEX_POOL.run('findall', pattern, string, flags):
+                result += m[0] + ('\t' if len(m) > 1 else '') + '\t'.join(m[1:]) + '\n'
+        except regexpool.RegexTimeout:
+            result += 'The expression took too long.\n'
+        except regexpool.RegexError:
             result += 'Error in flags or expression.\n'
         if result == '```\nResults:\n':
             result += 'No results :(\n'
@@ -191,88 +211,127 @@ class Regexes(object):
         result += '```'
         await ctx.send(result)
 
-client.add_cog(Regexes(client))
-
-DGHANGMANSHANPES = [
-    '```\n_\n\n\n\n_```',
-    '```\n_\n\n\n\u2500\u2500\u2500\u2500\u2500\n```',
-    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502\n\u2502\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
-    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
-    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
-    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  / \\\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
-    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /|\\\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
-    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /|\\\n\u2502  /\n\u2514\u2500\u2500\u2500\u2500\n```',
-    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /|\\\n\u2502  / \\\n\u2514\u2500\u2500\u2500\u2500\n```'
-]
+FUNGMAN_WORDS = hangman.WordPool(wordsDict.generate)
 
 class Games(object):
     def __init__(self, bot):
         self.bot = bot
+        self.sessions = sessions.SessionManager()
 
     @command()
     async def numguess(self, ctx):
         """Play a fun number-guessing game!"""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Games.numguess', extra={'invoker': ctx.message.author.name})
+        logger.info('Games.numguess', extra=botlog.context(ctx))
         guess = None
         limDn = 0
         limUp = 100
         tries = 7
         secret = random.randint(1, 100)
-        await ctx.send("""Arr! I'm the Dread Pirate Roberts, and I have a secret!
+        session = await self.openSession(ctx, 'numguess',
+            accept=lambda m: re.match('[0-9]+', m.content))
+        if session is None:
+            return
+        with session:
+            await ctx.send("""Arr! I'm the Dread Pirate Roberts, and I have a secret!
 It's a number from {} to {}. I'll give you {} tries.
 Send a number to guess it.""".format(limDn, limUp, tries))
-        while guess != secret and tries > 0:
-            await ctx.send("What's yer guess, matey?")
-            result = ''
-            guess = await ctx.bot.wait_for('message',
-                check=lambda m: m.channel == ctx.channel and re.match('[0-9]+', m.content))
-            guess = int(guess.content)
+            while guess != secret and tries > 0:
+                await ctx.send("What's yer guess, matey?")
+                result = ''
+                guess = int((await session.get()).content)
+                if guess == secret:
+                    break
+                elif guess < limDn or guess > limUp:
+                    result += "Out of range, ye swab!\n"
+                elif guess < secret:
+                    result += "Too low, ye scurvy dog!\n"
+                    limDn = guess
+                elif guess > secret:
+                    result += "Too high, landlubber!\n"
+                    limUp = guess
+                tries -= 1
+                result += "Yer range is {} to {}; ye have {} tries left.".format(limDn, limUp, tries)
+                await ctx.send(result)
             if guess == secret:
-                break
-            elif guess < limDn or guess > limUp:
-                result += "Out of range, ye swab!\n"
-            elif guess < secret:
-                result += "Too low, ye scurvy dog!\n"
-                limDn = guess
-            elif guess > secret:
-                result += "Too high, landlubber!\n"
-                limUp = guess
-            tries -= 1
-            result += "Yer range is {} to {}; ye have {} tries left.".format(limDn, limUp, tries)
-            await ctx.send(result)
-        if guess == secret:
-            await ctx.send("Avast! Ye got it! Found my secret, ye did! With {} tries left!".format(tries))
-        else:
-            await ctx.send("No more tries, matey! Better luck next time! The secret number was {}.".format(secret))
+                await ctx.send("Avast! Ye got it! Found my secret, ye did! With {} tries left!".format(tries))
+            else:
+                await ctx.send("No more tries, matey! Better luck next time! The secret number was {}.".format(secret))
+
+    async def openSession(self, ctx, kind, accept=None):
+        """Start a game session here, or explain why not and return None."""
+        try:
+            return self.sessions.open(ctx, kind, accept)
+        except router.Occupied:
+            await ctx.send("There is already a game going on in this channel!")
+        except sessions.SessionLimit as exc:
+            await ctx.send(str(exc))
+        return None
 
     @staticmethod
-    def substrs(sub, string):
-        last_found = -1
-        while 1:
-            last_found = string.find(sub, last_found + 1)
-            if last_found == -1:
-                break
-            yield last_found
-
-    channels_occupied_hangman = set()
-    channels_occupied_mine = set()
+    async def wordFromDM(ctx, session):
+        """Wait for the invoker to DM the word; None if they are busy elsewhere."""
+        dm = ctx.author.dm_channel or await ctx.author.create_dm()
+        try:
+            route = session.listen(dm.id, ctx.author.id)
+        except router.Occupied:
+            await ctx.send("You're already setting a word for another game!")
+            return None
+        with route:
+            return (await session.get(route)).content
+
+    @command()
+    async def games(self, ctx):
+        """List the games going on in this server."""
+        if await bMsg(ctx,ctx.author.id,client):
+            return
+        logger.info('Games.games', extra=botlog.context(ctx))
+        now = time.monotonic()
+        lines = []
+        for session in self.sessions.visibleTo(ctx):
+            lines.append('{} in {}, started by {} {}m ago (idle {}s)'.format(
+                session.kind,
+                getattr(session.channel, 'mention', 'DMs'),
+                session.owner.name,
+                int(now - session.started) // 60,
+                int(now - session.active),
+            ))
+        lines.append('{} of {} game slots in use overall.'.format(
+            len(self.sessions.sessions), self.sessions.maxTotal))
+        await ctx.send('\n'.join(lines))
     
     @command()
-    async def minesweeper(self,ctx):
+    async def minesweeper(self,ctx,size=None,mines: int=None):
         """ Minesweeper Beta
         Answer is (column)(space)(row) like 5 2.
         ? is unknown, _ is nothing, and X is mine.
+        size is beginner, intermediate, expert or WIDTHxHEIGHT (default 8x8).
         """
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Games.minesweeper', extra={'invoker': ctx.message.author.name})
-        if ctx.channel in self.channels_occupied_mine:
-            return await ctx.send("There is already a game going on in this channel!")
-        self.channels_occupied_mine.add(ctx.channel)
-        await minesweeper.play(ctx)
-        self.channels_occupied_mine.remove(ctx.channel)
+        logger.info('Games.minesweeper', extra=botlog.context(ctx))
+        width, height = 8, 8
+        if size in minesweeper.PRESETS:
+            width, height, preset = minesweeper.PRESETS[size]
+            if mines is None:
+                mines = preset
+        elif size is not None:
+            try:
+                width, height = map(int, size.lower().split('x'))
+            except ValueError:
+                return await ctx.send("Size must be a difficulty or WIDTHxHEIGHT, like 16x16.")
+        #the whole board has to fit in one message
+        if width < 2 or height < 2 or (width + 1) * height + 8 > 2000:
+            return await ctx.send("That board is too big to show!")
+        if mines is not None and not 1 <= mines < width * height:
+            return await ctx.send("That many mines won't fit!")
+        session = await self.openSession(ctx, 'minesweeper',
+            accept=minesweeper.acceptor(width, height))
+        if session is None:
+            return
+        with session:
+            await minesweeper.play(ctx, session, width, height, mines)
     @command()
     async def hangman(self, ctx, defaultWord = ""):
         """Yes, it's hangman!
@@ -281,63 +340,46 @@ Send a number to guess it.""".format(limDn, limUp, tries))
         Next, send the word in a DM with the bot, to set it.
         Once that's been done, guess a letter by sending it.
         """
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Games.hangman', extra={'invoker': ctx.message.author.name})
-        if ctx.channel in self.channels_occupied_hangman:
-            return await ctx.send("There is already a game going on in this channel!")
-        self.channels_occupied_hangman.add(ctx.channel)
-        if defaultWord == "":
-            await ctx.send("Awaiting DM with word...")
-            WORD = await ctx.bot.wait_for('message',
-                check=lambda m: isinstance(m.channel, d.DMChannel) and m.author == ctx.message.author)
-        else:
-            WORD = defaultWord
-        WORD = WORD.content.lower()
-        letters = ['_'] * len(WORD)
-        lowers = (
-            'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j',
-            'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't',
-            'u', 'v', 'w', 'x', 'y', 'z'
-        )
-        for i in range(len(WORD)):
-            if WORD[i] not in lowers:
-                letters[i] = WORD[i]
-        missed = []
-        shanpe = 0
-        await ctx.send(DGHANGMANSHANPES[shanpe] + '\n' + 'Missed:\nGotten: `' + "".join(letters) + '`')
-        while "".join(letters) != WORD and shanpe < len(DGHANGMANSHANPES) - 1:
-            letter = (await ctx.bot.wait_for('message',
-                check=lambda m: m.channel == ctx.channel and m.content in lowers)).content
-            if WORD.find(letter) != -1:
-                for i in self.substrs(letter, WORD):
-                    letters[i] = letter
+        logger.info('Games.hangman', extra=botlog.context(ctx))
+        #claim the channel now, but only take guesses once the word is set
+        session = await self.openSession(ctx, 'hangman', accept=lambda m: False)
+        if session is None:
+            return
+        with session:
+            if defaultWord == "":
+                await ctx.send("Awaiting DM with word...")
+                WORD = await self.wordFromDM(ctx, session)
+                if WORD is None:
+                    return
             else:
-                if letter not in missed:
-                    missed.append(letter)
-                    shanpe += 1
-            await ctx.send(DGHANGMANSHANPES[shanpe] + '\nMissed: ' + ','.join(missed) + '\nGotten: `' + "".join(letters) + '`')
-        if "".join(letters) == WORD:
-            await ctx.send('Congratulations! You have guessed the complete word!')
-        else:
-            await ctx.send('You lost! The word was \"{}\".'.format(WORD))
-        self.channels_occupied.remove(ctx.channel)
-    
-#    @command()
-#    async def fungman(self,ctx):
-#        """
-#        This is hangman. The text is generated automatically, and usually it's funny.
-#        """
-#        client.invoke(ctx,self.hangman(self,ctx,defaultWord=wordsDict.generate()))
+                WORD = defaultWord
+            await hangman.play(ctx, session, WORD)
 
     @command()
+    async def fungman(self, ctx):
+        """
+        This is hangman. The text is generated automatically, and usually it's funny.
+        """
+        if await bMsg(ctx,ctx.author.id,client):
+            return
+        logger.info('Games.fungman', extra=botlog.context(ctx))
+        session = await self.openSession(ctx, 'fungman', accept=hangman.isGuess)
+        if session is None:
+            return
+        with session:
+            await hangman.play(ctx, session, FUNGMAN_WORDS.draw())
+
+    @command()
+    @ratelimit.limit(ratelimit.Limiter(5, 10))
     async def saytext(self,ctx):
         """
         Say automatically-generated text, and it's usually funny. 
         """
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Games.saytext', extra={'invoker': ctx.message.author.name})
+        logger.info('Games.saytext', extra=botlog.context(ctx))
         await ctx.send(wordsDict.generate())
     
     @command()
@@ -349,160 +391,155 @@ Send a number to guess it.""".format(limDn, limUp, tries))
         send the word to set it,
         then send letters to guess them.
         """
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Games.localhangman', extra={'invoker': ctx.message.author.name})
-        if ctx.channel in self.channels_occupied:
-            await ctx.send('There is already a game going on in this channel!')
-        self.channels_occupied.add(ctx.channel)
-        await ctx.send('Awaiting DM with word...')
-        msg = await ctx.bot.wait_for('message',
-            check=lambda m: isinstance(m.channel, d.DMChannel) and m.author == ctx.author)
-        WORD = msg.content.lower()
-        letters = ['_'] * len(WORD)
-        lowers = (
-            'a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k',
-            'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v',
-            'w', 'x', 'y', 'z'
-        )
-        for i in range(len(WORD)):
-            if WORD[i] not in lowers:
-                letters[i] = WORD[i]
-        missed = []
-        shanpe = 0
-        status = await ctx.send(DGHANGMANSHANPES[shanpe] + '\nMissed: ' + ', '.join(missed) + '\nGotten: `' + "".join(letters) + '`')
-        while "".join(letters) != WORD and shanpe < len(DGHANGMANSHANPES) - 1:
-            guess = await ctx.bot.wait_for('message',
-                check=lambda m: m.channel == ctx.channel and m.content in lowers)
-            letter = guess.content
-            await guess.delete()
-            if WORD.find(letter) != -1:
-                for i in self.substrs(letter, WORD):
-                    letters[i] = letter
-            else:
-                if letter not in missed:
-                    missed.append(letter)
-                    shanpe += 1
-            await status.edit(content=(DGHANGMANSHANPES[shanpe] + '\nMissed: ' + ', '.join(missed) + '\nGotten: `' + "".join(letters) + '`'))
-        if "".join(letters) == WORD:
-            await ctx.send('Congratulations! You have guessed the complete word!')
-        else:
-            await ctx.send('You lost! The word was \"{}\".'.format(WORD))
-        self.channels_occupied.remove(ctx.channel)
+        logger.info('Games.localhangman', extra=botlog.context(ctx))
+        #claim the channel now, but only take guesses once the word is set
+        session = await self.openSession(ctx, 'localhangman', accept=lambda m: False)
+        if session is None:
+            return
+        with session:
+            await ctx.send('Awaiting DM with word...')
+            WORD = await self.wordFromDM(ctx, session)
+            if WORD is None:
+                return
+            await hangman.play(ctx, session, WORD, live=True)
 
     @localhangman.error
     async def on_localhangman_err(self, ctx, error):
-        logger.error('Games.localhangman failed: ' + str(error), extra={'invoker': ctx.message.author.name})
+        logger.error('Games.localhangman failed: %s', error, extra=botlog.context(ctx))
         if isinstance(error, c.BotMissingPermissions):
             await ctx.send(str(error))
 
-client.add_cog(Games(client))
-
-SESH = None
+WIKI_API = 'https://en.scratch-wiki.info/w/api.php'
+RC_PAGE = 500 #the API's rclimit cap for normal users
+WIKI_RESPONSES = wikicache.LRUCache(4 * 1024 * 1024)
 
 class Wiki(object):
     def __init__(self, bot):
         self.bot = bot
+        self.pages = wikicache.RevisionCache(self.req)
 
     @staticmethod
-    async def req(params):
+    async def req(params, ttl=0):
+        """Query the wiki API; responses may be reused for ``ttl`` seconds."""
         params['format'] = 'json'
-        async with SESH.get('https://en.scratch-wiki.info/w/api.php', params=params) as resp:
-            return await resp.json()
+        key = tuple(sorted(params.items()))
+        if ttl:
+            cached = WIKI_RESPONSES.get(key)
+            if cached is not None and time.time() - cached[1] < ttl:
+                return json.loads(cached[0])
+        text = (await TRANSPORT.get(WIKI_API, params=params)).text
+        if ttl:
+            WIKI_RESPONSES.put(key, text, len(text))
+        return json.loads(text)
 
     @command()
+    @bot_has_permissions(add_reactions=True, read_message_history=True)
+    @ratelimit.limit(ratelimit.Limiter(2, 10), WIKI_LIMIT)
     async def page(self, ctx, *, title):
-        """Get the contents of a page."""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        """Get the contents of a page.
+
+        Use Page#Section to only get one section of it.
+        React to turn the pages of the result.
+        """
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Wiki.page: ' + title, extra={'invoker': ctx.message.author.name})
+        logger.info('Wiki.page: %s', title, extra=botlog.context(ctx))
+        title, _, sectionName = title.partition('#')
         async with ctx.channel.typing():
             try:
-                content = await self.req({
-                    'action': 'query',
-                    'prop': 'revisions',
-                    'titles': title,
-                    'rvlimit': '1',
-                    'rvprop': 'content',
-                })
+                section = None
+                if sectionName:
+                    section = await self.sectionIndex(title, sectionName)
+                    if section is None:
+                        await ctx.send('There is no section called "{}" on that page.'.format(sectionName))
+                        return
+                content = await self.pages.content(title, section)
             except Exception:
                 await ctx.send('Fetching content failed. The page is likely too large. Sorry!')
                 return
-            content = list(content['query']['pages'].values())[0]['revisions'][0]['*']
-            content = content.splitlines()
-            contents = ['```\n']
-            i = 0
-            for line in content:
-                contents[i] += line + '\n'
-                if len(contents[i]) + 3 > 2000:
-                    contents.append('```')
-                    contents[i], contents[i+1] = contents[i].rsplit('\n', 1)
-                    contents[i] += '```'
-                    i += 1
-                    contents[i] = '```\n' + contents[i]
-            contents[-1] += '```'
-            for msg in contents:
-                await ctx.send(msg)
+        await paging.Pager(ctx, paging.chunks(content)).run()
+
+    async def sectionIndex(self, title, name):
+        """The rvsection number of the section headed ``name``, or None."""
+        resp = await self.req({
+            'action': 'parse',
+            'page': title,
+            'prop': 'sections',
+        }, ttl=300)
+        for sec in resp['parse']['sections']:
+            if name in (sec['line'], sec['anchor']):
+                return sec['index']
+        return None
+
+    @page.error
+    async def on_page_err(self, ctx, error):
+        logger.error('Wiki.page failed: %s', error, extra=botlog.context(ctx))
+        if isinstance(error, c.BotMissingPermissions):
+            await ctx.send(str(error))
 
     @command()
+    @ratelimit.limit(ratelimit.Limiter(1, 10), WIKI_LIMIT)
     async def recentchanges(self, ctx, limit=50):
         """Get recent changes on the Wiki."""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Wiki.recentchanges: ' + str(limit), extra={'invoker': ctx.message.author.name})
-        twenties, limit = divmod(limit, 20)
+        logger.info('Wiki.recentchanges: %s', limit, extra=botlog.context(ctx))
+        params = {
+            'action': 'query',
+            'list': 'recentchanges',
+            'rcprop': 'user|timestamp|comment|title|sizes|flags',
+            'rctype': 'edit|new',
+            'rclimit': min(limit, RC_PAGE),
+            'continue': '',
+        }
         async with ctx.channel.typing():
-            result = ['']
-            changes = []
-            start = 'now'
-            for i in [20 for j in range(twenties)] + [limit]:
-                resp = await self.req({
-                    'action': 'query',
-                    'list': 'recentchanges',
-                    'rcprop': 'user|timestamp|comment|title|sizes|flags',
-                        'rctype': 'edit|new',
-                    'rclimit': i,
-                    'rcstart': start
-                })
-                changes.extend(resp['query']['recentchanges'])
-                start = resp['query']['recentchanges'][-1]['timestamp']
-            i = 0
-            for ch in changes:
-                change = '\n'
-                change += ch['timestamp']
-                change += ': '
-                change += ch['title']
-                change += '; '
-                sizechange = ch['newlen'] - ch['oldlen']
-                if sizechange <= -500 or sizechange >= 500:
-                    change += '**'
-                change += '('
-                if sizechange <= 0:
-                    change += str(sizechange)
-                if sizechange > 0:
-                    change += '+' + str(sizechange)
-                change += ')'
-                if sizechange <= -500 or sizechange >= 500:
-                    change += '**'
-                change += ' . . '
-                change += ch['user']
-                change += ' _('
-                change += ch['comment'].replace('*', '\\*').replace('_', '\\_').replace('`', '\\`')
-                change += ')_'
-                result[i] += change
-                if len(result[i]) > 2000:
-                    result.append('')
-                    result[i], result[i+1] = result[i].rsplit('\n', 1)
-                    i += 1
-            for r in result:
-                await ctx.send(r)
+            nextPage = a.ensure_future(self.req(dict(params), ttl=30))
+            while nextPage is not None:
+                resp = await nextPage
+                changes = resp['query']['recentchanges']
+                limit -= len(changes)
+                nextPage = None
+                if limit > 0 and 'continue' in resp:
+                    #fetch the next page while this one is being sent
+                    params.update(resp['continue'])
+                    params['rclimit'] = min(limit, RC_PAGE)
+                    nextPage = a.ensure_future(self.req(dict(params), ttl=30))
+                await OUTBOUND.send_many(ctx, [self.formatChange(ch) for ch in changes], sep='')
+
+    @staticmethod
+    def formatChange(ch):
+        change = '\n'
+        change += ch['timestamp']
+        change += ': '
+        change += ch['title']
+        change += '; '
+        sizechange = ch['newlen'] - ch['oldlen']
+        if sizechange <= -500 or sizechange >= 500:
+            change += '**'
+        change += '('
+        if sizechange <= 0:
+            change += str(sizechange)
+        if sizechange > 0:
+            change += '+' + str(sizechange)
+        change += ')'
+        if sizechange <= -500 or sizechange >= 500:
+            change += '**'
+        change += ' . . '
+        change += ch['user']
+        change += ' _('
+        change += ch['comment'].replace('*', '\\*').replace('_', '\\_').replace('`', '\\`')
+        change += ')_'
+        return change
 
     @command()
+    @ratelimit.limit(ratelimit.Limiter(3, 10), WIKI_LIMIT)
     async def randompage(self, ctx):
         """Get a link to a random Wiki page!"""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Wiki.randompage', extra={'invoker': ctx.message.author.name})
+        logger.info('Wiki.randompage', extra=botlog.context(ctx))
         rn = await self.req({
             'action': 'query',
             'list': 'random',
@@ -514,162 +551,219 @@ class Wiki(object):
         title = quote(title, safe='/:')
         await ctx.send('https://en.scratch-wiki.info/wiki/' + title)
 
-client.add_cog(Wiki(client))
-
-global TRANSLATELIMIT
-TRANSLATELIMIT=time.time() - 20
+SCRATCH_API = 'https://api.scratch.mit.edu/'
+SCRATCH_SITE_API = 'https://scratch.mit.edu/site-api/'
+TRANSLATE_API = 'https://translate-service.scratch.mit.edu/'
+TRANSLATE_TIMEOUT = ClientTimeout(total=10)
+SUPPORTED_REFRESH = 6 * 60 * 60
+MESSAGECOUNT_NAMES = 10
 
 class Scratch(object):
     def __init__(self, bot):
         self.bot = bot
+        self.supported = None
+        self.supportedAt = 0
+        self.projects = projectpool.ProjectPool(self.projectCount, self.projectExists)
+        self.messageCounts = scratchusers.MessageCounts(self.messageCount)
+        self.translations = translations.TranslationCache(self.fetchTranslation)
 
     @staticmethod
-    async def req(url):
-        async with SESH.get(url) as resp:
-            if resp.status >= 400:
-                return None
-            else:
-                return await resp.text()
-    @staticmethod
-    def req2(url):
-        resp=requests.get(url)
-        if resp.status_code >= 400:
+    async def req(url, params=None, timeout=None):
+        resp = await TRANSPORT.get(url, params=params, timeout=timeout)
+        if resp.status >= 400:
             return None
         else:
             return resp.text
 
+    async def projectCount(self):
+        return json.loads(await self.req(SCRATCH_API + 'projects/count/all'))['count']
+
+    async def projectExists(self, pid):
+        return await self.req(SCRATCH_SITE_API + 'comments/project/' + str(pid)) is not None
+
+    async def messageCount(self, username):
+        resp = await self.req(SCRATCH_API + 'users/' + quote(username, safe='') + '/messages/count')
+        return None if resp is None else json.loads(resp)['count']
+
+    async def supportedLangs(self):
+        """The translate service's language codes, refetched every few hours."""
+        if self.supported is None or time.time() > self.supportedAt + SUPPORTED_REFRESH:
+            try:
+                resp = await self.req(TRANSLATE_API + 'supported', timeout=TRANSLATE_TIMEOUT)
+            except (ClientError, a.TimeoutError):
+                resp = None
+            if resp is not None:
+                self.supported = frozenset(x["code"] for x in json.loads(resp)["result"])
+                self.supportedAt = time.time()
+        return self.supported
+
     async def translater(self,ctx,lang="ja",txt=None):
-        global TRANSLATELIMIT
-        if time.time() < TRANSLATELIMIT + 20:
-            await ctx.send("You need to wait 20 seconds between translating commands!")
-            await warnMsg(ctx,ctx.message.author.name,"Please don't use translate commands so quickly.",client)
-            return
         if txt == None:
             return
-        resp=self.req2("https://translate-service.scratch.mit.edu/supported")
-        if resp == None:
+        supported = await self.supportedLangs()
+        if supported is None:
             return
-        respjson=json.loads(resp)
-        supported=map(lambda x:x["code"],respjson["result"])
         if lang not in supported:
             lang="ja"
-        addr="https://translate-service.scratch.mit.edu/translate?language={0}&text={1}".format(lang,txt)
-        resp=self.req2(addr)
-        if resp == None:
+        try:
+            result = await self.translations.get(lang, txt)
+        except (ClientError, a.TimeoutError):
+            result = None
+        if result == None:
             return
-        logger.info('Scratch.translater {0} {1} {2}'.format(lang,txt,addr), extra={'invoker': ctx.message.author.name})
-        await ctx.send(json.loads(resp)["result"])
-        TRANSLATELIMIT = time.time()
-        return
+        logger.info('Scratch.translater %s %s', lang, txt, extra=botlog.context(ctx))
+        await ctx.send(result)
+
+    async def fetchTranslation(self, lang, txt):
+        resp = await self.req(TRANSLATE_API + 'translate',
+                              params={'language': lang, 'text': txt},
+                              timeout=TRANSLATE_TIMEOUT)
+        return None if resp is None else json.loads(resp)["result"]
 
     @command()
+    @ratelimit.limit(ratelimit.Limiter(2, 10), SCRATCH_LIMIT)
     async def randomproject(self, ctx):
         """Get a random project link!"""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Scratch.randomproject', extra={'invoker': ctx.message.author.name})
+        logger.info('Scratch.randomproject', extra=botlog.context(ctx))
         async with ctx.channel.typing():
-            count = json.loads(await self.req('https://api.scratch.mit.edu/projects/count/all'))['count']
-            comments = None
-            while comments is None:
-                pid = random.randint(1, count)
-                comments = await self.req('https://scratch.mit.edu/site-api/comments/project/' + str(pid))
+            try:
+                pid = await a.wait_for(self.projects.get(), 30)
+            except a.TimeoutError:
+                await ctx.send("Couldn't find a project right now. Try again later!")
+                return
             await ctx.send('https://scratch.mit.edu/projects/' + str(pid))
 
     @command()
-    async def messagecount(self, ctx, name=None):
-        """How many messages do you have on Scratch?"""
-        if await bMsg(ctx,ctx.message.author.name,client):
+    @ratelimit.limit(ratelimit.Limiter(3, 10), SCRATCH_LIMIT)
+    async def messagecount(self, ctx, *names):
+        """How many messages do you have on Scratch?
+
+        Name up to 10 Scratchers to check theirs instead.
+        """
+        if await bMsg(ctx,ctx.author.id,client):
             return
         async with ctx.channel.typing():
-            username = name
-            if username is None:
-                username = ctx.message.author.name
-            resp = await self.req('https://api.scratch.mit.edu/users/' + username + '/messages/count')
-            if resp is None and name is None:
-                username = getattr(ctx.message.author, 'nick', '_')
-                resp = await self.req('https://api.scratch.mit.edu/users/' + username + '/messages/count')
-            logger.info('Scratch.messagecount: ' + username, extra={'invoker': ctx.message.author.name})
-            if resp is None:
-                await ctx.send("Couldn't get message count for " + username)
+            names = names[:MESSAGECOUNT_NAMES]
+            if names:
+                counts = await self.messageCounts.getMany(names)
             else:
-                await ctx.send('{} has {} messages'.format(
-                    username,
-                    json.loads(resp)['count']
-                ))
+                names = [ctx.message.author.name]
+                counts = await self.messageCounts.getMany(names)
+                nick = getattr(ctx.message.author, 'nick', None)
+                if counts[0] is None and nick:
+                    names = [nick]
+                    counts = await self.messageCounts.getMany(names)
+            logger.info('Scratch.messagecount: %s', ' '.join(names), extra=botlog.context(ctx))
+            await OUTBOUND.send_many(ctx, [
+                "Couldn't get message count for " + username
+                if count is None or isinstance(count, Exception)
+                else '{} has {} messages'.format(username, count)
+                for username, count in zip(names, counts)
+            ])
 
     @command()
+    @ratelimit.limit(ratelimit.Limiter(1, 10, 'channel'), SCRATCH_LIMIT)
     async def news(self, ctx):
         """Get Scratch news."""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
-        logger.info('Scratch.news', extra={'invoker': ctx.message.author.name})
-        content = await self.req('https://api.scratch.mit.edu/news')
+        logger.info('Scratch.news', extra=botlog.context(ctx))
+        content = await self.req(SCRATCH_API + 'news')
         content = json.loads(content)
-        for new in content[0:5]:
-            await ctx.send(
-                '**' + new['headline'] + '**'
-                + '\n' + new['copy'] + '\n' + new['url']
-            )
+        items = [(new['headline'], new['copy'] + '\n' + new['url']) for new in content[0:5]]
+        if ctx.channel.permissions_for(ctx.me).embed_links:
+            await OUTBOUND.send_many(ctx, items)
+        else:
+            #plain text, as before embeds, where the bot may not embed
+            await OUTBOUND.send_many(ctx, [
+                '**' + headline + '**\n' + body for headline, body in items
+            ], sep='\n\n')
 
 
 
     @command()
+    @ratelimit.limit(TRANSLATE_USER_LIMIT, TRANSLATE_LIMIT)
     async def translate(self,ctx,lang="ja",txt=None):
         """ Apple can speak many languages!
 translate <lang=ja> <text=None>
 Never forget to write \" before and after the text you translate! """
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
         await self.translater(ctx,lang,txt)
 
     @command()
+    @ratelimit.limit(TRANSLATE_USER_LIMIT, TRANSLATE_LIMIT)
     async def funslate(self,ctx,lang="ja"):
         """ Translate funny text.
 funslate <lang=ja>"""
-        if await bMsg(ctx,ctx.message.author.name,client):
+        if await bMsg(ctx,ctx.author.id,client):
             return
         await self.translater(ctx,lang,wordsDict.generate())
 
 
-client.add_cog(Scratch(client))
+@client.before_invoke
+async def startTimer(ctx):
+    ratelimit.take(ctx)
+    ctx.started = time.monotonic()
+    METRICS.commandStarted(ctx.command.qualified_name)
+
+@client.after_invoke
+async def logLatency(ctx):
+    latency = time.monotonic() - ctx.started
+    METRICS.commandFinished(ctx.command.qualified_name, latency, ctx.command_failed)
+    logger.info('%s finished', ctx.command.qualified_name,
+                extra=botlog.context(ctx, latency=round(latency, 4)))
+
+@client.command()
+async def stats(ctx):
+    """For owner"""
+    if ctx.message.author.name != "apple502j":
+        return
+    await OUTBOUND.send_many(ctx, paging.chunks(
+        METRICS.summary() + '\n' + client.get_cog('Scratch').translations.summary()))
+
+@client.event
+async def on_message(message):
+    router.ROUTER.dispatch(message)
+    await client.process_commands(message)
 
 @client.event
 async def on_ready(*_, **__):
-    global SESH
     logger.info('Ready!', extra={'invoker': '(core)'})
-    SESH = ClientSession()
+    client.get_cog('Scratch').projects.start()
     await client.change_presence(activity=d.Game(name="Help is:$help"))
 
 @client.command()
 async def repeat(ctx, *, arg):
     """Repeat what you say, right back at ya."""
-    if await bMsg(ctx,ctx.message.author.name,client):
+    if await bMsg(ctx,ctx.author.id,client):
             return
-    logger.info('repeat: ' + arg, extra={'invoker': ctx.message.author.name})
+    logger.info('repeat: %s', arg, extra=botlog.context(ctx))
     await ctx.send(arg)
 
 @client.command()
 async def hello(ctx):
     """Test whether the bot is running! Simply says "Hello World!"."""
-    if await bMsg(ctx,ctx.message.author.name,client):
+    if await bMsg(ctx,ctx.author.id,client):
             return
-    logger.info('Hello World!', extra={'invoker': ctx.message.author.name})
+    logger.info('Hello World!', extra=botlog.context(ctx))
     await ctx.send('Hello World!')
 
 @client.command()
 async def hmmst(ctx):
     """hmmst"""
-    if await bMsg(ctx,ctx.message.author.name,client):
+    if await bMsg(ctx,ctx.author.id,client):
             return
-    logger.info('hmmst', extra={'invoker': ctx.message.author.name})
+    logger.info('hmmst', extra=botlog.context(ctx))
     await ctx.send('hmmst')
 
 
 @client.command()
 async def whichpc(ctx):
     """ Check which PC is running the bot."""
-    if await bMsg(ctx,ctx.message.author.name,client):
+    if await bMsg(ctx,ctx.author.id,client):
             return
     if platform.win32_ver()[0] == '7':
         await ctx.send("My main PC (Windows 7)")
@@ -679,7 +773,7 @@ async def whichpc(ctx):
 @client.command()
 async def mine(ctx):
     """Shortcut of minesweeper."""
-    if await bMsg(ctx,ctx.message.author.name,client):
+    if await bMsg(ctx,ctx.author.id,client):
             return
     await ctx.send('Hey, this command is **mine**!')
 
@@ -687,6 +781,38 @@ async def mine(ctx):
 async def whoami(ctx):
     await ctx.send(ctx.message.author.name)
 
+ADMINS = admins.AdminIndex()
+
+@client.event
+async def on_member_join(member):
+    ADMINS.memberUpdated(member)
+
+@client.event
+async def on_member_update(before, after):
+    ADMINS.memberUpdated(after)
+
+@client.event
+async def on_member_remove(member):
+    ADMINS.memberRemoved(member)
+
+@client.event
+async def on_guild_role_update(before, after):
+    if before.permissions != after.permissions:
+        ADMINS.forget(after.guild)
+
+@client.event
+async def on_guild_role_delete(role):
+    ADMINS.forget(role.guild)
+
+@client.event
+async def on_guild_update(before, after):
+    if before.owner_id != after.owner_id:
+        ADMINS.forget(after)
+
+@client.event
+async def on_guild_remove(guild):
+    ADMINS.forget(guild)
+
 DGBANSERVERID = 328938947717890058
 #DGBANSERVERID = 337100820371996675
 
@@ -694,28 +820,22 @@ DGBANSERVERID = 328938947717890058
 @bot_has_permissions(ban_members=True, add_reactions=True, read_message_history=True)
 async def votetoban(ctx, *, user: d.Member):
     """Start a vote to ban someone from the server. Abuse results in a ban."""
-    if await bMsg(ctx,ctx.message.author.name,client):
+    if await bMsg(ctx,ctx.author.id,client):
             return
-    logger.info('votetoban: ' + user.mention, extra={'invoker': ctx.message.author.name})
+    logger.info('votetoban: %s', user.mention, extra=botlog.context(ctx))
     if ctx.guild.id != DGBANSERVERID:
         return
-    for member in ctx.guild.members:
-        if (not str(member.status) == 'offline') \
-                and ctx.channel.permissions_for(member).administrator:
-            await ctx.send(member.mention + ', someone requests for ' + user.mention + ' to be banned!')
-            return
+    admin = ADMINS.onlineAdmin(ctx.guild)
+    if admin is not None:
+        await ctx.send(admin.mention + ', someone requests for ' + user.mention + ' to be banned!')
+        return
     DOBAN = '陜}ｩ'
     NOBAN = '陜qd'
     msg = await ctx.send('**Vote to ban ' + user.mention + '**\nReact ' + DOBAN + ' to vote to ban; react ' + NOBAN + ' to vote to keep.')
     await msg.add_reaction(DOBAN)
     await msg.add_reaction(NOBAN)
     try:
-        await ctx.bot.wait_for('member_update',
-            check=lambda o, m: \
-                ctx.channel.permissions_for(m).administrator \
-                and not str(m.status) == 'offline',
-            timeout=180.0
-        )
+        await ADMINS.waitOnline(ctx.guild, timeout=180.0)
         await msg.delete()
         await ctx.send('An admin has come online! The vote has been cancelled. Please ask them instead.')
     except a.TimeoutError:
@@ -740,18 +860,47 @@ async def votetoban(ctx, *, user: d.Member):
 
 @votetoban.error
 async def on_votetoban_err(ctx, error):
-    logger.error('votetoban failed: ' + str(error), extra={'invoker': ctx.message.author.name})
+    logger.error('votetoban failed: %s', error, extra=botlog.context(ctx))
     if isinstance(error, c.BotMissingPermissions):
         await ctx.send(str(error))
     else:
         raise error
 
 
-if True:
+def setup():
+    """Open the bot's logs and databases, add its cogs and start its background tasks.
+
+    None of this happens on import: the regex workers may import this
+    module afresh, and must not repeat it.
+    """
+    global LOG_LISTENER, ESCALATION, INFO
+    LOG_LISTENER = botlog.setup(logger)
+    legacy = sum(len(names) for names in secret.BLOCKLIST.legacy.values())
+    if legacy:
+        logger.warning('Blocklist: kept %s name entries from the old format until they are banned by ID', legacy)
+    ESCALATION = escalation.Escalation()
+    INFO = infostore.InfoStore(os.path.join(os.getcwd(), 'info'))
+    INFO.poll()
+    for cog in (Regexes, Games, Wiki, Scratch):
+        client.add_cog(cog(client))
+    client.loop.create_task(flushBlocklist())
+    client.loop.create_task(ESCALATION.flushLoop(logger=logger))
+    client.loop.create_task(METRICS.writeLoop(logger=logger))
+    client.loop.create_task(INFO.pollLoop(logger=logger))
+
+if __name__ == '__main__':
+    setup()
     print('Defined stuff')
 
     with open('login.txt') as f:
         token = f.read().strip()
 
-    client.run(token)
+    try:
+        client.run(token)
+    finally:
+        secret.BLOCKLIST.compact()
+        ESCALATION.close()
+        client.get_cog('Scratch').translations.close()
+        REGEX_POOL.close()
+        LOG_LISTENER.stop()
 
@@ -0,0 +1,91 @@
+import asyncio
+
+def isOnline(member):
+    return str(member.status) != 'offline'
+
+class AdminIndex:
+    """The administrators of each guild, and which of them are online.
+
+    A guild is scanned once, the first time it is asked about; after
+    that the member, role and guild events below keep it current, so
+    asking whether an admin is online costs a set lookup. Role and
+    guild changes that could affect many members just drop the guild,
+    to be scanned again when next needed.
+    """
+    def __init__(self):
+        self.admins = {}
+        self.online = {}
+        self.waiters = {}
+
+    def _scan(self, guild):
+        admins = self.admins[guild.id] = set()
+        online = self.online[guild.id] = set()
+        for member in guild.members:
+            if member.guild_permissions.administrator:
+                admins.add(member.id)
+                if isOnline(member):
+                    online.add(member.id)
+
+    def onlineAdmin(self, guild):
+        """An administrator of ``guild`` who is online, or None."""
+        if guild.id not in self.admins:
+            self._scan(guild)
+        for uid in self.online[guild.id]:
+            member = guild.get_member(uid)
+            if member is not None:
+                return member
+        return None
+
+    async def waitOnline(self, guild, timeout=None):
+        """Wait for an administrator of ``guild`` to come online; return them.
+
+        Raises asyncio.TimeoutError after ``timeout`` seconds.
+        """
+        if guild.id not in self.admins:
+            self._scan(guild)
+        fut = asyncio.get_event_loop().create_future()
+        waiters = self.waiters.setdefault(guild.id, [])
+        waiters.append(fut)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            waiters.remove(fut)
+            if not waiters:
+                del self.waiters[guild.id]
+
+    def memberUpdated(self, member):
+        """Call on member join and update (roles, nickname or status)."""
+        admins = self.admins.get(member.guild.id)
+        if admins is None:
+            return
+        online = self.online[member.guild.id]
+        if not member.guild_permissions.administrator:
+            admins.discard(member.id)
+            online.discard(member.id)
+            return
+        admins.add(member.id)
+        if not isOnline(member):
+            online.discard(member.id)
+        elif member.id not in online:
+            online.add(member.id)
+            self._wake(member)
+
+    def _wake(self, member):
+        for fut in self.waiters.get(member.guild.id, ()):
+            if not fut.done():
+                fut.set_result(member)
+
+    def memberRemoved(self, member):
+        if member.guild.id in self.admins:
+            self.admins[member.guild.id].discard(member.id)
+            self.online[member.guild.id].discard(member.id)
+
+    def forget(self, guild):
+        """Call when roles or ownership change; rescans ``guild`` when next asked."""
+        self.admins.pop(guild.id, None)
+        self.online.pop(guild.id, None)
+        if guild.id in self.waiters:
+            #someone is waiting on this guild, so it must stay current
+            member = self.onlineAdmin(guild)
+            if member is not None:
+                self._wake(member)
@@ -0,0 +1,204 @@
+"""Time the bot's hot paths with no network and no Discord connection.
+
+Commands are called directly with fake contexts, and the wiki, Scratch
+and translate APIs are served locally (see fakes.py). Everything random
+is seeded, so two runs do the same work. Run from the repository root::
+
+	python benchmarks/bench_bot.py --output new.json
+	python benchmarks/bench_bot.py --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import subprocess
+import tempfile
+import time
+
+import fakes
+import minesweeper
+import paging
+import router
+import secret
+import wordsDict
+
+SEED = 502
+
+class Env:
+    """What every benchmark gets: the bot module, the upstream and an RNG."""
+    def __init__(self, bot, upstream):
+        self.bot = bot
+        self.upstream = upstream
+        self.rng = random.Random(SEED)
+        self.author = fakes.FakeUser('bencher')
+
+    def context(self, command, content=''):
+        """A fresh context in a fresh channel, so no game blocks the next."""
+        return fakes.FakeContext(content=content, author=self.author, command=command)
+
+    def cog(self, name):
+        return self.bot.client.get_cog(name)
+
+async def benchBMsg(env):
+    ctx = env.context('bmsg')
+    for uid in range(100):
+        await env.bot.bMsg(ctx, uid, env.bot.client)
+
+async def benchGetWarnType(env):
+    for uid in range(1000):
+        secret.getWarnType(uid)
+
+async def benchSearch(env):
+    await env.bot.Regexes.search.callback(env.cog('Regexes'), env.context('search'),
+        r'(\w+)@(\w+)\.com', 'mail apple502j@example.com or kenny@example.com')
+
+async def benchFindall(env):
+    await env.bot.Regexes.findall.callback(env.cog('Regexes'), env.context('findall'),
+        r'(\w+)@(\w+)\.com', ' '.join('user{}@host{}.com'.format(i, i) for i in range(50)))
+
+async def benchMineSetup(env):
+    width, height, mines = minesweeper.PRESETS['expert']
+    minesweeper.MinesweeperGame(width, height, mines, rng=env.rng)
+
+async def benchMinePlay(env):
+    width, height, mines = minesweeper.PRESETS['expert']
+    game = minesweeper.MinesweeperGame(width, height, mines, rng=env.rng)
+    cells = list(range(width * height))
+    env.rng.shuffle(cells)
+    for cell in cells:
+        if game.board[cell] != minesweeper.MINE and not game.shown[cell]:
+            game.reveal(cell % width + 1, cell // width + 1)
+            game.render(False)
+
+async def benchGenerate(env):
+    for _ in range(100):
+        wordsDict.generate()
+
+async def benchFormatChange(env):
+    for ch in env.upstream.changes:
+        env.bot.Wiki.formatChange(ch)
+
+async def benchChunks(env):
+    for _ in paging.chunks(env.upstream.page):
+        pass
+
+async def benchPage(env):
+    await env.bot.Wiki.page.callback(env.cog('Wiki'), env.context('page'), title='Scratch Cat')
+
+async def benchPageSection(env):
+    await env.bot.Wiki.page.callback(env.cog('Wiki'), env.context('page'), title='Scratch Cat#Section 7')
+
+async def benchRecentChanges(env):
+    await env.bot.Wiki.recentchanges.callback(env.cog('Wiki'), env.context('recentchanges'), 1000)
+
+async def benchHangman(env):
+    ctx = env.context('hangman')
+    guesses = iter(env.rng.sample(string.ascii_lowercase, 26))
+    def guess(_):
+        letter = next(guesses, None)
+        if letter is not None:
+            router.ROUTER.dispatch(fakes.FakeMessage(letter, ctx.author, ctx.channel))
+    ctx.channel.onSend = guess
+    await env.bot.Games.hangman.callback(env.cog('Games'), ctx, 'the scratch wiki')
+
+#name: (benchmark, calls per timing, timings)
+BENCHMARKS = [
+    ('bMsg x100', benchBMsg, 10, 5),
+    ('getWarnType x1000', benchGetWarnType, 10, 5),
+    ('Regexes.search', benchSearch, 20, 5),
+    ('Regexes.findall', benchFindall, 20, 5),
+    ('minesweeper setup (expert)', benchMineSetup, 50, 5),
+    ('minesweeper play (expert)', benchMinePlay, 5, 5),
+    ('wordsDict.generate x100', benchGenerate, 10, 5),
+    ('Wiki.formatChange x2000', benchFormatChange, 5, 5),
+    ('paging.chunks (3000 lines)', benchChunks, 20, 5),
+    ('Wiki.page', benchPage, 10, 5),
+    ('Wiki.page#section', benchPageSection, 10, 5),
+    ('Wiki.recentchanges 1000', benchRecentChanges, 5, 5),
+    ('Games.hangman', benchHangman, 20, 5),
+]
+
+async def measure(env, bench, number, repeat):
+    """Seconds per call for each of ``repeat`` timings of ``number`` calls."""
+    random.seed(SEED)
+    env.rng.seed(SEED)
+    await bench(env) #warm up caches, connections and worker processes
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await bench(env)
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+def revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=fakes.ROOT,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def runAll(bot, only):
+    upstream = fakes.Upstream(seed=SEED)
+    await fakes.connect(bot, upstream)
+    env = Env(bot, upstream)
+    results = {}
+    try:
+        for name, bench, number, repeat in BENCHMARKS:
+            if only and not any(o in name for o in only):
+                continue
+            timings = await measure(env, bench, number, repeat)
+            results[name] = {
+                'best_us': min(timings) * 1e6,
+                'median_us': statistics.median(timings) * 1e6,
+            }
+            print('{:<30}{:>14.1f}{:>14.1f}'.format(
+                name, results[name]['best_us'], results[name]['median_us']))
+    finally:
+        await fakes.disconnect(bot, upstream)
+    return results
+
+def compare(results, path):
+    with open(path) as f:
+        old = json.load(f)['results']
+    print()
+    print('{:<30}{:>14}{:>14}{:>9}'.format('vs ' + path, 'old (us)', 'new (us)', 'ratio'))
+    for name, new in results.items():
+        if name not in old:
+            continue
+        ratio = new['best_us'] / old[name]['best_us']
+        print('{:<30}{:>14.1f}{:>14.1f}{:>8.2f}x{}'.format(
+            name, old[name]['best_us'], new['best_us'], ratio,
+            '  <- slower' if ratio > 1.1 else ''))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare with')
+    parser.add_argument('only', nargs='*', help='only run benchmarks whose names contain these')
+    args = parser.parse_args()
+    output = args.output and os.path.abspath(args.output)
+    old = args.compare and os.path.abspath(args.compare)
+    with tempfile.TemporaryDirectory() as workdir:
+        bot = fakes.loadBot(workdir)
+        print('{:<30}{:>14}{:>14}'.format('benchmark', 'best (us)', 'median (us)'))
+        results = bot.client.loop.run_until_complete(runAll(bot, args.only))
+        os.chdir(fakes.ROOT)
+    if output:
+        with open(output, 'w') as f:
+            json.dump({
+                'revision': revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': SEED,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+    if old:
+        compare(results, old)
+
+if __name__ == '__main__':
+    main()
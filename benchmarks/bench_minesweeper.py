@@ -0,0 +1,55 @@
+"""Time board setup and per-move cost of the minesweeper engine.
+
+Run from the repository root::
+
+	python benchmarks/bench_minesweeper.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import minesweeper
+
+SIZES = [
+    ('8x8', (8, 8, 10)),
+    ('beginner', minesweeper.PRESETS['beginner']),
+    ('intermediate', minesweeper.PRESETS['intermediate']),
+    ('expert', minesweeper.PRESETS['expert']),
+    ('100x100', (100, 100, 2000)),
+]
+
+def playOut(width, height, mines, seed):
+    """Reveal every safe cell in random order; return the number of moves."""
+    rng = random.Random(seed)
+    game = minesweeper.MinesweeperGame(width, height, mines, rng=rng)
+    safe = [c for c in range(width * height) if game.board[c] != minesweeper.MINE]
+    rng.shuffle(safe)
+    moves = 0
+    for cell in safe:
+        if game.shown[cell]:
+            continue
+        moves += 1
+        if game.reveal(cell % width + 1, cell // width + 1):
+            break
+    return moves
+
+def main():
+    print('{:<14}{:>14}{:>14}{:>10}'.format('board', 'setup (us)', 'move (us)', 'moves'))
+    for name, (width, height, mines) in SIZES:
+        runs = 20
+        setup = min(timeit.repeat(
+            lambda: minesweeper.MinesweeperGame(width, height, mines, rng=random.Random(0)),
+            number=runs, repeat=3)) / runs
+        total = 0.0
+        moves = 0
+        for seed in range(runs):
+            start = timeit.default_timer()
+            moves += playOut(width, height, mines, seed)
+            total += timeit.default_timer() - start - setup
+        print('{:<14}{:>14.1f}{:>14.2f}{:>10}'.format(
+            name, setup * 1e6, total / moves * 1e6, moves // runs))
+
+if __name__ == '__main__':
+    main()
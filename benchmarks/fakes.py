@@ -0,0 +1,322 @@
+"""Offline stand-ins for Discord and the upstream APIs, for benchmarks.
+
+Nothing here touches the network: the Discord objects are plain Python,
+and Discord's REST API and the wiki/Scratch/translate APIs are served
+by local aiohttp apps.
+"""
+import asyncio
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import sys
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+IDS = itertools.count(1000)
+
+class Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        pass
+
+class FakeGuild:
+    def __init__(self, id):
+        self.id = id
+
+class FakeMessage:
+    def __init__(self, content, author, channel):
+        self.id = next(IDS)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.reactions = []
+
+    async def delete(self):
+        self.channel.deleted += 1
+
+    async def edit(self, content=None, embed=None):
+        self.content = content
+        self.channel.edits += 1
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def remove_reaction(self, emoji, member):
+        pass
+
+    async def clear_reactions(self):
+        pass
+
+class FakeChannel:
+    """Counts what is sent; ``onSend`` (if set) is called after every send."""
+    def __init__(self, id=None, guild=None):
+        self.id = next(IDS) if id is None else id
+        self.guild = guild
+        self.mention = '<#{}>'.format(self.id)
+        self.sent = 0
+        self.edits = 0
+        self.deleted = 0
+        self.onSend = None
+
+    async def send(self, content=None, embed=None):
+        self.sent += 1
+        msg = FakeMessage(content, BOT_USER, self)
+        if self.onSend is not None:
+            self.onSend(msg)
+        return msg
+
+    async def delete_messages(self, messages):
+        self.deleted += len(messages)
+
+    def typing(self):
+        return Typing()
+
+class FakeUser:
+    def __init__(self, name, id=None):
+        self.id = next(IDS) if id is None else id
+        self.name = name
+        self.mention = '<@{}>'.format(self.id)
+        self.bot = False
+        self.dm_channel = None
+
+    async def create_dm(self):
+        self.dm_channel = FakeChannel()
+        return self.dm_channel
+
+BOT_USER = FakeUser('kenny2automate')
+
+class FakeCommand:
+    def __init__(self, name):
+        self.qualified_name = name
+
+    def __str__(self):
+        return self.qualified_name
+
+class FakeBot:
+    """Nobody reacts or replies, so every wait_for times out at once."""
+    async def wait_for(self, event, check=None, timeout=None):
+        raise asyncio.TimeoutError
+
+class FakeContext:
+    def __init__(self, bot=None, content='', author=None, channel=None, guild=None, command=''):
+        self.bot = bot or FakeBot()
+        self.author = author or FakeUser('bencher')
+        self.guild = guild if guild is not None else FakeGuild(1)
+        self.channel = channel or FakeChannel(guild=self.guild)
+        self.message = FakeMessage(content, self.author, self.channel)
+        self.command = FakeCommand(command)
+
+    async def send(self, content=None, embed=None):
+        return await self.channel.send(content, embed=embed)
+
+def freePort():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class Upstream:
+    """Local replacement for the wiki, Scratch and translate APIs.
+
+    Responses are generated from ``seed`` so every run sees the same
+    data; ``delay`` adds simulated server latency to every request.
+    """
+    def __init__(self, seed=0, pageLines=3000, changes=2000, delay=0.0):
+        rng = random.Random(seed)
+        words = ['scratch', 'sprite', 'block', 'wiki', 'costume', 'stage', 'variable', 'list']
+        self.delay = delay
+        self.requests = 0
+        self.page = '\n'.join(
+            ('== Section {} =='.format(i // 100) if i % 100 == 0 else
+             ' '.join(rng.choice(words) for _ in range(rng.randint(3, 20))))
+            for i in range(pageLines))
+        self.changes = [{
+            'timestamp': '2018-06-01T00:{:02d}:{:02d}Z'.format(i // 60 % 60, i % 60),
+            'title': rng.choice(words).capitalize() + ' ' + str(i),
+            'user': rng.choice(words) + str(rng.randint(1, 99)),
+            'oldlen': rng.randint(0, 5000),
+            'newlen': rng.randint(0, 5000),
+            'comment': ' '.join(rng.choice(words + ['*', '_']) for _ in range(rng.randint(0, 12))),
+        } for i in range(changes)]
+        self.app = web.Application()
+        self.app.router.add_get('/w/api.php', self.wiki)
+        self.app.router.add_get('/api/projects/count/all', self.count)
+        self.app.router.add_get('/api/users/{user}/messages/count', self.messages)
+        self.app.router.add_get('/api/news', self.news)
+        self.app.router.add_get('/site-api/comments/project/{pid}', self.comments)
+        self.app.router.add_get('/translate-service/supported', self.supported)
+        self.app.router.add_get('/translate-service/translate', self.translate)
+
+    async def respond(self, data, status=200):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return web.Response(text=json.dumps(data), status=status, content_type='application/json')
+
+    async def wiki(self, request):
+        q = request.query
+        if q.get('action') == 'parse':
+            return await self.respond({'parse': {'sections': [
+                {'line': 'Section {}'.format(i), 'anchor': 'Section_{}'.format(i), 'index': str(i)}
+                for i in range(1, self.page.count('== Section'))]}})
+        if q.get('prop') == 'info':
+            return await self.respond({'query': {'pages': {'1': {'lastrevid': 1}}}})
+        if q.get('prop') == 'revisions':
+            text = self.page
+            if 'rvsection' in q:
+                text = text.split('\n== ')[int(q['rvsection'])]
+            return await self.respond({'query': {'pages': {'1': {
+                'revisions': [{'revid': 1, '*': text}]}}}})
+        if q.get('list') == 'recentchanges':
+            start = int(q.get('rccontinue', 0))
+            end = start + int(q.get('rclimit', 10))
+            data = {'query': {'recentchanges': self.changes[start:end]}}
+            if end < len(self.changes):
+                data['continue'] = {'rccontinue': str(end), 'continue': '-||'}
+            return await self.respond(data)
+        if q.get('list') == 'random':
+            return await self.respond({'query': {'random': [{'title': 'Scratch Cat'}]}})
+        return await self.respond({'error': 'unknown'}, 400)
+
+    async def count(self, request):
+        return await self.respond({'count': 1000})
+
+    async def messages(self, request):
+        if request.match_info['user'] == 'nobody':
+            return await self.respond({'code': 'NotFound'}, 404)
+        return await self.respond({'count': len(request.match_info['user'])})
+
+    async def news(self, request):
+        return await self.respond([{
+            'id': i, 'headline': 'Headline {}'.format(i),
+            'copy': 'Something happened on Scratch. ' * 5,
+            'url': 'https://scratch.mit.edu/discuss/topic/{}'.format(i),
+        } for i in range(10)])
+
+    async def comments(self, request):
+        if int(request.match_info['pid']) % 3:
+            return await self.respond({}, 404)
+        return await self.respond([])
+
+    async def supported(self, request):
+        return await self.respond({'result': [{'code': c} for c in ('ja', 'en', 'es', 'fr', 'de')]})
+
+    async def translate(self, request):
+        return await self.respond({'result': request.query['text'][::-1]})
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        port = freePort()
+        await web.TCPSite(self.runner, '127.0.0.1', port).start()
+        self.base = 'http://127.0.0.1:{}'.format(port)
+        return self.base
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+def userPayload(id, name, bot=False):
+    return {'id': str(id), 'username': name, 'discriminator': '0001', 'avatar': None, 'bot': bot}
+
+def messagePayload(id, channelId, author, content, embeds=(), guildId=None):
+    """A message object as Discord's gateway and REST API send it."""
+    data = {
+        'id': str(id), 'channel_id': str(channelId), 'author': author,
+        'content': content, 'type': 0, 'tts': False, 'pinned': False,
+        'timestamp': '2018-06-01T00:00:00.000000+00:00', 'edited_timestamp': None,
+        'mention_everyone': False, 'mentions': [], 'mention_roles': [],
+        'attachments': [], 'embeds': list(embeds), 'reactions': [],
+    }
+    if guildId is not None:
+        data['guild_id'] = str(guildId)
+    return data
+
+def jsonResponse(data):
+    #discord.py only decodes bodies typed exactly application/json
+    return web.Response(body=json.dumps(data).encode(), headers={'Content-Type': 'application/json'})
+
+class DiscordREST:
+    """Local replacement for Discord's REST API.
+
+    Sent and edited messages are echoed back as Discord would; anything
+    else (typing, reactions, deletes) just succeeds. ``onMessage`` (if
+    set) is called with the channel ID and content of every sent message.
+    """
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = 0
+        self.onMessage = None
+        self.me = userPayload(next(IDS), BOT_USER.name, bot=True)
+        self.app = web.Application()
+        self.app.router.add_route('*', '/api/v7/{path:.*}', self.handle)
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        parts = request.match_info['path'].split('/')
+        if parts == ['users', '@me']:
+            return jsonResponse(self.me)
+        if len(parts) in (3, 4) and parts[0] == 'channels' and parts[2] == 'messages':
+            channelId = int(parts[1])
+            data = await request.json() if request.can_read_body else {}
+            if request.method == 'POST' and len(parts) == 3:
+                if self.onMessage is not None:
+                    self.onMessage(channelId, data.get('content') or '')
+                return jsonResponse(self.message(channelId, data, next(IDS)))
+            if request.method in ('GET', 'PATCH') and len(parts) == 4 and parts[3].isdigit():
+                return jsonResponse(self.message(channelId, data, int(parts[3])))
+        return web.Response(text='', content_type='text/plain')
+
+    def message(self, channelId, data, id):
+        embed = data.get('embed')
+        return messagePayload(id, channelId, self.me, data.get('content') or '',
+                              [embed] if embed else ())
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        port = freePort()
+        await web.TCPSite(self.runner, '127.0.0.1', port).start()
+        self.base = 'http://127.0.0.1:{}/api/v7'.format(port)
+        return self.base
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+def loadBot(workdir):
+    """Import and set up the bot module (without running it) inside ``workdir``.
+
+    Its blocklist, counters and logs are created there, and logging is
+    turned down to warnings so it does not dominate the timings.
+    """
+    os.chdir(workdir)
+    spec = importlib.util.spec_from_file_location('kenny2automate_bot', os.path.join(ROOT, '__main__.py'))
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    bot.setup()
+    bot.logger.setLevel(logging.WARNING)
+    return bot
+
+async def connect(bot, upstream):
+    """Point the bot at ``upstream``."""
+    base = await upstream.start()
+    bot.WIKI_API = base + '/w/api.php'
+    bot.SCRATCH_API = base + '/api/'
+    bot.SCRATCH_SITE_API = base + '/site-api/'
+    bot.TRANSLATE_API = base + '/translate-service/'
+
+async def disconnect(bot, upstream):
+    await bot.TRANSPORT.close()
+    await upstream.stop()
+    bot.REGEX_POOL.close()
+    bot.ESCALATION.close()
+    bot.client.get_cog('Scratch').translations.close()
+    bot.LOG_LISTENER.stop()
@@ -0,0 +1,256 @@
+"""Replay chat traffic through the bot and measure how much it can take.
+
+Each message in the trace is built the way the gateway delivers a
+MESSAGE_CREATE event and handed to the bot's on_message, which routes
+game input and runs client.process_commands. Discord's REST API and the
+wiki, Scratch and translate APIs are served locally, so nothing leaves
+the machine. Run from the repository root::
+
+	python benchmarks/loadtest.py --rate 50 --duration 30
+	python benchmarks/loadtest.py --trace recorded.jsonl --speed 2
+
+A trace is JSON lines of ``{"t": seconds, "channel": name, "author":
+name, "content": text}``; --save-trace writes the generated one.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import string
+import tempfile
+import time
+from collections import defaultdict, deque
+
+import discord as d
+
+import fakes
+
+SEED = 502
+
+#(weight, message template); see generate()
+MIX = [
+    (15, '$hello'),
+    (10, '$saytext'),
+    (10, '$search "(\\w+)@(\\w+)\\.com" "mail {user}@example.com"'),
+    (5, '$findall "(\\w+)@(\\w+)\\.com" "{user}@a.com {user}@b.com {user}@c.com"'),
+    (10, '$page Scratch Cat'),
+    (5, '$page Scratch Cat#Section {n}'),
+    (5, '$recentchanges 100'),
+    (5, '$translate ja "hello from {user}"'),
+    (5, '$messagecount {user}'),
+    (5, '$news'),
+    (5, '$randomproject'),
+    (5, None), #a hangman game, with its guesses
+]
+HANGMAN_WORDS = ['scratch cat', 'sprite', 'costume', 'broadcast', 'the scratch wiki']
+GUESS_INTERVAL = 0.5
+
+def generate(rate, duration, seed=SEED, channels=20, authors=200):
+    """A random trace of about ``rate`` messages a second for ``duration`` seconds."""
+    rng = random.Random(seed)
+    total = sum(weight for weight, _ in MIX)
+    events = []
+    games = itertools.count()
+    t = rng.expovariate(rate)
+    while t < duration:
+        user = 'user-{}'.format(rng.randrange(authors))
+        point = rng.uniform(0, total)
+        for weight, template in MIX:
+            point -= weight
+            if point <= 0:
+                break
+        if template is None:
+            #every game gets its own channel so games never collide
+            channel = 'game-{}'.format(next(games))
+            events.append({'t': t, 'channel': channel, 'author': user,
+                           'content': '$hangman "{}"'.format(rng.choice(HANGMAN_WORDS))})
+            for i, letter in enumerate(rng.sample(string.ascii_lowercase, 26)):
+                events.append({'t': t + (i + 1) * GUESS_INTERVAL, 'channel': channel,
+                               'author': user, 'content': letter})
+        else:
+            events.append({'t': t, 'channel': 'chat-{}'.format(rng.randrange(channels)),
+                           'author': user,
+                           'content': template.format(user=user, n=rng.randint(1, 29))})
+        t += rng.expovariate(rate)
+    events.sort(key=lambda e: e['t'])
+    return events
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def removeLimits(client):
+    """Drop every ratelimit.limit check, to measure the bot rather than its limits."""
+    for cmd in client.walk_commands():
+        cmd.checks = [check for check in cmd.checks if not hasattr(check, 'limiters')]
+
+class LoadTest:
+    """Drives one bot module with a trace against local stand-ins.
+
+    Latency is from delivering a command to the bot's first message in
+    that channel afterwards, so commands that keep running (games, page
+    turners) are measured by how fast they answer.
+    """
+    def __init__(self, bot, events, speed=1.0, restDelay=0.0, upstreamDelay=0.0):
+        self.bot = bot
+        self.client = bot.client
+        self.events = events
+        self.speed = speed
+        self.rest = fakes.DiscordREST(restDelay)
+        self.rest.onMessage = self.replied
+        self.upstream = fakes.Upstream(seed=SEED, delay=upstreamDelay)
+        self.ids = itertools.count(450000000000000000)
+        self.pending = defaultdict(deque)
+        self.latencies = []
+        self.lags = []
+        self.rateLimited = 0
+        self.errors = 0
+        self.delivered = 0
+
+    async def setup(self):
+        await fakes.connect(self.bot, self.upstream)
+        d.http.Route.BASE = await self.rest.start()
+        state = self.client._connection
+        state.user = d.ClientUser(state=state, data=await self.client.http.static_login('load-test', bot=True))
+        channels = sorted(set(e['channel'] for e in self.events))
+        authors = sorted(set(e['author'] for e in self.events))
+        self.guildId = next(self.ids)
+        self.channelIds = {name: next(self.ids) for name in channels}
+        self.authors = {name: fakes.userPayload(next(self.ids), name) for name in authors}
+        members = list(self.authors.values()) + [self.rest.me]
+        self.guild = state._add_guild_from_data({
+            'id': str(self.guildId), 'name': 'Load test', 'owner_id': self.rest.me['id'],
+            'region': 'us-west', 'member_count': len(members), 'large': False,
+            'features': [], 'emojis': [], 'presences': [], 'voice_states': [],
+            'roles': [{'id': str(self.guildId), 'name': '@everyone', 'permissions': 104324161,
+                       'position': 0, 'color': 0, 'hoist': False, 'managed': False,
+                       'mentionable': False}],
+            'channels': [{'id': str(id), 'name': name, 'type': 0, 'position': i,
+                          'permission_overwrites': []}
+                         for i, (name, id) in enumerate(sorted(self.channelIds.items()))],
+            'members': [{'user': user, 'roles': [], 'deaf': False, 'mute': False,
+                         'joined_at': '2018-01-01T00:00:00.000000+00:00'} for user in members],
+        })
+
+    async def teardown(self):
+        await self.client.http.close()
+        await self.rest.stop()
+        await fakes.disconnect(self.bot, self.upstream)
+
+    def replied(self, channelId, content):
+        waiting = self.pending.get(channelId)
+        if waiting:
+            self.latencies.append(time.perf_counter() - waiting.popleft())
+        if content.startswith('Slow down!'):
+            self.rateLimited += 1
+
+    async def deliver(self, event):
+        channel = self.guild.get_channel(self.channelIds[event['channel']])
+        message = self.client._connection.create_message(channel=channel, data=fakes.messagePayload(
+            next(self.ids), channel.id, self.authors[event['author']], event['content'],
+            guildId=self.guildId))
+        if event['content'].startswith(self.client.command_prefix):
+            self.pending[channel.id].append(time.perf_counter())
+        self.delivered += 1
+        try:
+            await self.bot.on_message(message)
+        except Exception:
+            self.errors += 1
+
+    async def watchLag(self, interval=0.01):
+        """Record how late the loop wakes up from ``interval``-second sleeps."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.lags.append(time.perf_counter() - start - interval)
+
+    async def run(self, drain=10.0):
+        watcher = asyncio.ensure_future(self.watchLag())
+        tasks = []
+        start = time.perf_counter()
+        for event in self.events:
+            wait = start + event['t'] / self.speed - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            tasks.append(asyncio.ensure_future(self.deliver(event)))
+        sent = time.perf_counter()
+        deadline = sent + drain
+        while any(self.pending.values()) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        #games still waiting for guesses and pages waiting for reactions
+        watcher.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(watcher, *tasks, return_exceptions=True)
+        commands = sum(e['content'].startswith(self.client.command_prefix) for e in self.events)
+        return {
+            'events': len(self.events),
+            'target_rate': len(self.events) * self.speed / self.events[-1]['t'] if self.events else 0,
+            'delivered_rate': self.delivered / (sent - start),
+            'commands': commands,
+            'answered': len(self.latencies),
+            'throughput': len(self.latencies) / elapsed,
+            'rate_limited': self.rateLimited,
+            'errors': self.errors,
+            'latency_p50_ms': percentile(self.latencies, 0.5) * 1e3,
+            'latency_p99_ms': percentile(self.latencies, 0.99) * 1e3,
+            'latency_max_ms': max(self.latencies, default=0) * 1e3,
+            'loop_lag_p50_ms': percentile(self.lags, 0.5) * 1e3,
+            'loop_lag_p99_ms': percentile(self.lags, 0.99) * 1e3,
+            'loop_lag_max_ms': max(self.lags, default=0) * 1e3,
+            'rest_requests': self.rest.requests,
+            'upstream_requests': self.upstream.requests,
+        }
+
+async def loadTest(bot, events, args):
+    test = LoadTest(bot, events, args.speed, args.rest_delay, args.upstream_delay)
+    await test.setup()
+    try:
+        return await test.run(args.drain)
+    finally:
+        await test.teardown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trace', help='replay this JSON-lines trace instead of generating one')
+    parser.add_argument('--save-trace', help='write the generated trace here')
+    parser.add_argument('--rate', type=float, default=20.0, help='messages a second to generate')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of trace to generate')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay the trace this many times faster')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--rest-delay', type=float, default=0.0, help='simulated Discord API latency')
+    parser.add_argument('--upstream-delay', type=float, default=0.0, help='simulated wiki/Scratch latency')
+    parser.add_argument('--drain', type=float, default=10.0, help='seconds to wait for late answers')
+    parser.add_argument('--no-limits', action='store_true', help='turn off per-command rate limits')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+    if args.trace:
+        with open(args.trace) as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    else:
+        events = generate(args.rate, args.duration, args.seed)
+        if args.save_trace:
+            with open(args.save_trace, 'w') as f:
+                f.writelines(json.dumps(e) + '\n' for e in events)
+    output = args.output and os.path.abspath(args.output)
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        bot = fakes.loadBot(workdir)
+        if args.no_limits:
+            removeLimits(bot.client)
+        results = bot.client.loop.run_until_complete(loadTest(bot, events, args))
+        os.chdir(fakes.ROOT)
+    for key, value in results.items():
+        print('{:<20}{:>12.1f}'.format(key, value) if isinstance(value, float)
+              else '{:<20}{:>12}'.format(key, value))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
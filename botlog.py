@@ -0,0 +1,83 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+#per-record fields; pass them through ``extra`` (see context())
+FIELDS = ('invoker', 'command', 'guild', 'latency')
+
+def context(ctx, **fields):
+    """The ``extra`` for a log call made while handling ``ctx``."""
+    extra = {
+        'invoker': ctx.author.name,
+        'command': ctx.command.qualified_name if ctx.command is not None else None,
+        'guild': ctx.guild.id if ctx.guild is not None else None,
+    }
+    extra.update(fields)
+    return extra
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are, so all formatting happens on the writer thread.
+
+    Records are dropped (and counted) rather than blocking the caller
+    when the writer falls ``maxsize`` records behind.
+    """
+    dropped = 0
+
+    def prepare(self, record):
+        for field in FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, '(core)' if field == 'invoker' else None)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JSONLinesFormatter(logging.Formatter):
+    converter = time.gmtime
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%SZ'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for field in FIELDS:
+            entry[field] = getattr(record, field, None)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+consolefmt = logging.Formatter(
+    fmt='{asctime} {invoker}: {message}',
+    datefmt='%Y-%m-%dT%H:%M:%SZ',
+    style='{'
+)
+
+def setup(logger, path='kenny2automate.jsonl', maxBytes=10 * 1024 * 1024,
+          backupCount=5, console=True, maxsize=10000):
+    """Send ``logger`` through a queue to a writer thread.
+
+    The thread writes JSON lines to ``path``, rotating it at ``maxBytes``
+    and keeping ``backupCount`` old files, and echoes to stdout if
+    ``console``. Returns the started QueueListener; stop() it on exit.
+    """
+    records = queue.Queue(maxsize)
+    handlers = []
+    filehandler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=maxBytes, backupCount=backupCount, encoding='utf-8')
+    filehandler.setFormatter(JSONLinesFormatter())
+    handlers.append(filehandler)
+    if console:
+        stdout = logging.StreamHandler(sys.stdout)
+        stdout.setFormatter(consolefmt)
+        handlers.append(stdout)
+    logger.addHandler(DeferredQueueHandler(records))
+    listener = logging.handlers.QueueListener(records, *handlers)
+    listener.start()
+    return listener
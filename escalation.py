@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from sqlworker import SQLiteWorker
+
+KINDS = ('warnings', 'alerts')
+
+class Escalation:
+    """Per-user warning/alert counters that decay after ``ttl`` seconds.
+
+    Counters live in an LRU of at most ``maxEntries`` users; changes are
+    batched and written to SQLite on a single worker thread, so the event
+    loop never waits on the database except to fetch an evicted user.
+    """
+    def __init__(self, path='escalation.sqlite3', ttl=86400.0, maxEntries=10000):
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.dirty = {}
+        self.db = SQLiteWorker(path)
+        conn = self.db.conn
+        conn.execute('CREATE TABLE IF NOT EXISTS counters ('
+                     'id INTEGER PRIMARY KEY, warnings INTEGER, '
+                     'alerts INTEGER, touched REAL)')
+        conn.execute('DELETE FROM counters WHERE touched < ?',
+                     (time.time() - ttl,))
+        conn.commit()
+        rows = conn.execute('SELECT id, warnings, alerts, touched FROM counters '
+                                 'ORDER BY touched DESC LIMIT ?', (maxEntries,))
+        for uid, warnings, alerts, touched in reversed(rows.fetchall()):
+            self.entries[uid] = [warnings, alerts, touched]
+
+    def _fetch(self, uid):
+        return self.db.conn.execute('SELECT warnings, alerts, touched FROM counters '
+                                    'WHERE id = ?', (uid,)).fetchone()
+
+    async def _entry(self, uid, touch=True):
+        now = time.time()
+        entry = self.entries.get(uid)
+        if entry is None:
+            entry = self.dirty.get(uid)
+            if entry is None:
+                row = await self.db.run(self._fetch, uid)
+                #another coroutine may have loaded it while we waited
+                entry = self.entries.get(uid) or self.dirty.get(uid) \
+                    or (list(row) if row else [0, 0, now])
+            self.entries[uid] = entry
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(uid)
+        if now - entry[2] > self.ttl:
+            entry[0] = entry[1] = 0
+        if touch:
+            entry[2] = now
+        return entry
+
+    async def get(self, uid, kind):
+        return (await self._entry(uid, touch=False))[KINDS.index(kind)]
+
+    async def bump(self, uid, kind):
+        """Increment and return a counter."""
+        entry = await self._entry(uid)
+        entry[KINDS.index(kind)] += 1
+        self.dirty[uid] = entry
+        return entry[KINDS.index(kind)]
+
+    async def reset(self, uid, kind):
+        entry = await self._entry(uid)
+        entry[KINDS.index(kind)] = 0
+        self.dirty[uid] = entry
+
+    def _write(self, rows):
+        conn = self.db.conn
+        conn.executemany('INSERT OR REPLACE INTO counters '
+                         '(id, warnings, alerts, touched) VALUES (?, ?, ?, ?)', rows)
+        conn.execute('DELETE FROM counters WHERE touched < ?',
+                     (time.time() - self.ttl,))
+        conn.commit()
+
+    async def flush(self):
+        dirty, self.dirty = self.dirty, {}
+        if dirty:
+            rows = [(uid,) + tuple(entry) for uid, entry in dirty.items()]
+            try:
+                await self.db.run(self._write, rows)
+            except BaseException:
+                #keep them for the next flush, unless changed again meanwhile
+                for uid, entry in dirty.items():
+                    self.dirty.setdefault(uid, entry)
+                raise
+
+    async def flushLoop(self, interval=10.0, logger=None):
+        """Flush every ``interval`` seconds; failures are logged and retried."""
+        logger = logger or logging.getLogger(__name__)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Escalation flush failed')
+
+    def close(self):
+        dirty, self.dirty = self.dirty, {}
+        if dirty:
+            #queued behind any write still in progress
+            self.db.executor.submit(self._write, [(uid,) + tuple(entry) for uid, entry in dirty.items()])
+        self.db.close()
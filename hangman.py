@@ -0,0 +1,110 @@
+import string
+from collections import deque
+import livemsg
+
+LETTERS = frozenset(string.ascii_lowercase)
+
+SHAPES = [
+    '```\n_\n\n\n\n_```',
+    '```\n_\n\n\n\u2500\u2500\u2500\u2500\u2500\n```',
+    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502\n\u2502\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
+    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
+    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
+    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  / \\\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
+    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /|\\\n\u2502\n\u2514\u2500\u2500\u2500\u2500\n```',
+    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /|\\\n\u2502  /\n\u2514\u2500\u2500\u2500\u2500\n```',
+    '```\n\u250c\u2500\u2500\u2500\u2510\n\u2502   O\n\u2502  /|\\\n\u2502  / \\\n\u2514\u2500\u2500\u2500\u2500\n```'
+]
+
+def isGuess(m):
+    return m.content in LETTERS
+
+class HangmanGame:
+    """A word being guessed letter by letter.
+
+    Where each letter occurs is worked out once, when the game starts,
+    so a guess only touches the positions it reveals and winning is a
+    counter reaching zero. Anything but a-z is shown from the start.
+    """
+    __slots__ = ('word', 'positions', 'shown', 'hidden', 'guessed', 'missed')
+
+    def __init__(self, word):
+        self.word = word.lower()
+        self.positions = {}
+        self.shown = []
+        for i, ch in enumerate(self.word):
+            if ch in LETTERS:
+                self.positions.setdefault(ch, []).append(i)
+                self.shown.append('_')
+            else:
+                self.shown.append(ch)
+        self.hidden = sum(len(p) for p in self.positions.values())
+        self.guessed = set()
+        self.missed = []
+
+    def guess(self, letter):
+        """Guess ``letter``; return whether it is in the word."""
+        positions = self.positions.get(letter)
+        if letter in self.guessed:
+            return positions is not None
+        self.guessed.add(letter)
+        if positions is None:
+            self.missed.append(letter)
+            return False
+        for i in positions:
+            self.shown[i] = letter
+        self.hidden -= len(positions)
+        return True
+
+    @property
+    def won(self):
+        return not self.hidden
+
+    @property
+    def lost(self):
+        return len(self.missed) >= len(SHAPES) - 1
+
+    def status(self):
+        return SHAPES[len(self.missed)] + '\nMissed: ' + ', '.join(self.missed) \
+            + '\nGotten: `' + ''.join(self.shown) + '`'
+
+class WordPool:
+    """Words drawn from ``source()``, made ``size`` at a time ahead of need."""
+    def __init__(self, source, size=64):
+        self.source = source
+        self.size = size
+        self.words = deque()
+
+    def draw(self):
+        if not self.words:
+            self.words.extend(self.source() for _ in range(self.size))
+        return self.words.popleft()
+
+async def play(ctx, session, word, live=False):
+    """Run a game in ``session`` until the word is guessed or the man is hanged.
+
+    With ``live``, one status message is edited and guesses are deleted;
+    otherwise the status is sent again after every guess.
+    """
+    game = HangmanGame(word)
+    session.route.accept = isGuess
+    if live:
+        status = livemsg.LiveMessage(await ctx.send(game.status()))
+        guesses = livemsg.DeleteBatcher(ctx.channel)
+    else:
+        await ctx.send(game.status())
+    while not (game.won or game.lost):
+        guess = await session.get()
+        game.guess(guess.content)
+        if live:
+            guesses.delete(guess)
+            status.edit(game.status())
+        else:
+            await ctx.send(game.status())
+    if live:
+        await status.close()
+        await guesses.close()
+    if game.won:
+        await ctx.send('Congratulations! You have guessed the complete word!')
+    else:
+        await ctx.send('You lost! The word was \"{}\".'.format(game.word))
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+
+class InfoStore:
+    """The ``*.txt`` files of one directory, held in memory by name.
+
+    poll() rereads only files whose modification time or size changed
+    and forgets deleted ones. A new or changed file that would take the
+    total past ``budget`` bytes is not loaded until room is made.
+    Lookups never touch the disk, and since they are by name only, no
+    request can reach a file outside the directory.
+    """
+    def __init__(self, directory='info', budget=1024 * 1024, suffix='.txt'):
+        self.directory = directory
+        self.budget = budget
+        self.suffix = suffix
+        self.entries = {}
+        self.used = 0
+
+    def get(self, name):
+        """The text of ``name``, or None."""
+        entry = self.entries.get(name)
+        return entry and entry[2]
+
+    def _read(self, path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def poll(self):
+        """Bring the store up to date with the directory."""
+        try:
+            files = [e for e in os.scandir(self.directory)
+                     if e.name.endswith(self.suffix) and e.is_file(follow_symlinks=False)]
+        except FileNotFoundError:
+            files = []
+        found = {e.name[:-len(self.suffix)]: e for e in files}
+        #drop deleted files first, to make room for new ones
+        for name in set(self.entries) - set(found):
+            self.used -= self.entries.pop(name)[1]
+        for name, entry in found.items():
+            old = self.entries.get(name)
+            try:
+                #editors that save by renaming can remove the file after scandir
+                stat = entry.stat(follow_symlinks=False)
+                version = (stat.st_mtime_ns, stat.st_size)
+                if old is not None and old[0] == version:
+                    continue
+                oldSize = old[1] if old is not None else 0
+                if self.used - oldSize + stat.st_size > self.budget:
+                    continue
+                text = self._read(entry.path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            self.entries[name] = (version, stat.st_size, text)
+            self.used += stat.st_size - oldSize
+
+    async def pollLoop(self, interval=10.0, logger=None):
+        """poll() every ``interval`` seconds; failures are logged and retried."""
+        logger = logger or logging.getLogger(__name__)
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.poll)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Info store poll failed')
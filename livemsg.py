@@ -0,0 +1,69 @@
+import asyncio
+import discord as d
+
+class LiveMessage:
+    """A status message that is edited at most once per ``interval`` seconds.
+
+    ``edit`` only records the wanted content. A single background task
+    sends it, and any edits made while that request (or a rate-limit
+    wait) is in flight collapse into one request with the latest content.
+    """
+    def __init__(self, message, interval=1.0):
+        self.message = message
+        self.interval = interval
+        self.pending = None
+        self.task = None
+
+    def edit(self, content):
+        self.pending = content
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        while self.pending is not None:
+            content, self.pending = self.pending, None
+            try:
+                await self.message.edit(content=content)
+            except d.HTTPException:
+                #deleted or otherwise gone; nothing more to show
+                self.pending = None
+                return
+            if self.pending is not None:
+                await asyncio.sleep(self.interval)
+
+    async def close(self):
+        """Wait until the latest content has been sent."""
+        if self.task is not None:
+            await self.task
+
+class DeleteBatcher:
+    """Deletes messages in bulk, gathering them for ``interval`` seconds."""
+    def __init__(self, channel, interval=1.0):
+        self.channel = channel
+        self.interval = interval
+        self.pending = []
+        self.task = None
+
+    def delete(self, message):
+        self.pending.append(message)
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(self.interval)
+        while self.pending:
+            #bulk deletes take 2 to 100 messages, and only in guild channels
+            batch, self.pending = self.pending[:100], self.pending[100:]
+            try:
+                if len(batch) > 1 and hasattr(self.channel, 'delete_messages'):
+                    await self.channel.delete_messages(batch)
+                else:
+                    for message in batch:
+                        await message.delete()
+            except d.HTTPException:
+                pass
+
+    async def close(self):
+        """Wait until everything queued has been deleted."""
+        if self.task is not None:
+            await self.task
@@ -0,0 +1,138 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+from collections import defaultdict
+
+#upper bounds in seconds, Prometheus-style
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+class Upstream:
+    """Times one request to ``host``; use with ``async with``."""
+    def __init__(self, metrics, host):
+        self.metrics = metrics
+        self.host = host
+
+    async def __aenter__(self):
+        self.metrics.upstreamInflight[self.host] += 1
+        self.start = time.monotonic()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.metrics.upstreamInflight[self.host] -= 1
+        self.metrics.upstreamLatency[self.host].observe(time.monotonic() - self.start)
+        if exc_type is not None:
+            self.metrics.upstreamErrors[self.host] += 1
+
+class Metrics:
+    """In-memory latency histograms, error counts and in-flight gauges,
+    per command and per upstream host."""
+    def __init__(self):
+        self.commandLatency = defaultdict(Histogram)
+        self.commandErrors = defaultdict(int)
+        self.commandInflight = defaultdict(int)
+        self.upstreamLatency = defaultdict(Histogram)
+        self.upstreamErrors = defaultdict(int)
+        self.upstreamInflight = defaultdict(int)
+
+    def commandStarted(self, name):
+        self.commandInflight[name] += 1
+
+    def commandFinished(self, name, seconds, failed=False):
+        self.commandInflight[name] -= 1
+        self.commandLatency[name].observe(seconds)
+        if failed:
+            self.commandErrors[name] += 1
+
+    def upstream(self, host):
+        return Upstream(self, host)
+
+    def summary(self):
+        """Human-readable table of the slowest commands and hosts."""
+        lines = []
+        for title, latency, errors, inflight in (
+            ('Commands', self.commandLatency, self.commandErrors, self.commandInflight),
+            ('Upstreams', self.upstreamLatency, self.upstreamErrors, self.upstreamInflight),
+        ):
+            lines.append('{:<28}{:>7}{:>7}{:>5}{:>9}{:>9}'.format(
+                title, 'count', 'errors', 'now', 'p50<=', 'p99<='))
+            ranked = sorted(latency.items(), key=lambda i: i[1].total, reverse=True)
+            for name, hist in ranked:
+                lines.append('{:<28}{:>7}{:>7}{:>5}{:>8}s{:>8}s'.format(
+                    name[:27], hist.count, errors[name], inflight[name],
+                    hist.quantile(0.5), hist.quantile(0.99)))
+            lines.append('')
+        return '\n'.join(lines)
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        out = []
+        for metric, label, latency, errors, inflight in (
+            ('command', 'command', self.commandLatency, self.commandErrors, self.commandInflight),
+            ('upstream', 'host', self.upstreamLatency, self.upstreamErrors, self.upstreamInflight),
+        ):
+            name = 'kenny2automate_{}_seconds'.format(metric)
+            out.append('# TYPE {} histogram'.format(name))
+            for key, hist in sorted(latency.items()):
+                seen = 0
+                for bound, n in zip(BUCKETS + ('+Inf',), hist.counts):
+                    seen += n
+                    out.append('{}_bucket{{{}="{}",le="{}"}} {}'.format(name, label, key, bound, seen))
+                out.append('{}_sum{{{}="{}"}} {}'.format(name, label, key, hist.total))
+                out.append('{}_count{{{}="{}"}} {}'.format(name, label, key, hist.count))
+            name = 'kenny2automate_{}_errors_total'.format(metric)
+            out.append('# TYPE {} counter'.format(name))
+            for key, n in sorted(errors.items()):
+                out.append('{}{{{}="{}"}} {}'.format(name, label, key, n))
+            name = 'kenny2automate_{}_inflight'.format(metric)
+            out.append('# TYPE {} gauge'.format(name))
+            for key, n in sorted(inflight.items()):
+                out.append('{}{{{}="{}"}} {}'.format(name, label, key, n))
+        return '\n'.join(out) + '\n'
+
+    def _write(self, path, text):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    async def writeLoop(self, path='metrics.prom', interval=15.0, logger=None):
+        """Rewrite ``path`` every ``interval`` seconds for a local scraper.
+
+        A failed write is logged and tried again on the next interval.
+        """
+        logger = logger or logging.getLogger(__name__)
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self._write, path, self.prometheus())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Metrics write failed')
+
+METRICS = Metrics()
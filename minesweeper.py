@@ -1,155 +1,138 @@
-from random import randint
+from array import array
+from collections import deque
+import random
 import re
+import livemsg
 # Minesweeper
 
-def intz(thing):
-   try:
-       return int(thing)
-   except ValueError:
-       return 0
-
 class MineObj:
    mine = "X"
    unknown = "?"
    no = "_"
 
-def oc(x,left=False,right=False):
-  if x<0:
-      return False
-  elif x>len(MINES) - 1:
-      return False
-  elif x%8==0 and left:
-     return False
-  elif x%8==7 and right:
-     return False
-  return True
-
-def ocb(x):
-   if x<0:
-       return False
-   elif x>len(MINES) - 1:
-       return False
-   elif MINES[x] != MineObj.no:
-       return False
-   return True
-global MINES,FOUND_MINES
-def setupMine():
-   global MINES,FOUND_MINES
-   MINES = list(MineObj.no * 64)
-   FOUND_MINES = list(MineObj.unknown * 64)
-
-   for i in range(randint(1,10)):
-      mineid = randint(0,63)
-      MINES[mineid] = MineObj.mine
-      if oc(mineid - 1):
-          MINES[mineid - 1] = str(1+intz(MINES[mineid - 1]))
-      if oc(mineid + 1):
-          MINES[mineid + 1] = str(1+intz(MINES[mineid + 1]))
-      if oc(mineid - 9):
-          MINES[mineid - 9] = str(1+intz(MINES[mineid - 9]))
-      if oc(mineid - 8):
-          MINES[mineid - 8] = str(1+intz(MINES[mineid - 8]))
-      if oc(mineid - 7):
-          MINES[mineid - 7] = str(1+intz(MINES[mineid - 7]))
-      if oc(mineid + 9):
-          MINES[mineid + 9] = str(1+intz(MINES[mineid + 9]))
-      if oc(mineid + 8):
-          MINES[mineid + 8] = str(1+intz(MINES[mineid + 8]))
-      if oc(mineid + 7):
-          MINES[mineid + 7] = str(1+intz(MINES[mineid + 7]))
-
-async def printList(ctx):
-   global FOUND_MINES
-   output="```\n"
-   for j in range(8):
-       for k in range(8):
-           output+=FOUND_MINES[8*j+k]
-       output+="\n"
-   output+="```"
-   return await ctx.send(output)
-
-async def updateList(ctx,status):
-   global FOUND_MINES
-   output="```\n"
-   for j in range(8):
-       for k in range(8):
-           output+=FOUND_MINES[8*j+k]
-       output+="\n"
-   output+="```"
-   await status.edit(content=output)
-   return
-async def checkCell(cellStr,ctx,status):
-   global MINES,FOUND_MINES
-   try:
-       cellIds=list(map(intz,cellStr.split(" ")))
-   except TypeError:
-       return
-   cellID = (cellIds[1] - 1) * 8 + cellIds[0] - 1
-   if MINES[cellID] == MineObj.mine:
-       await ctx.send("Game over!")
-       FOUND_MINES = MINES
-       await updateList(ctx,status)
-       return (1,FOUND_MINES)
-   elif FOUND_MINES[cellID] != MineObj.unknown:
-       return (0,FOUND_MINES)
-   elif MINES[cellID] == "1" or MINES[cellID] == "2" or MINES[cellID] == "3" or MINES[cellID] == MineObj.no:
-       FOUND_MINES[cellID] = MINES[cellID]
-       checkCell=[cellID]
-       checkedCell = set()
-       paths = 0
-       while len(checkCell) != 0:
-           paths += 1
-           cellID=checkCell[0]
-           if ocb(cellID - 1) and (cellID - 1) not in checkedCell:
-               FOUND_MINES[cellID - 1] = MINES[cellID - 1]
-               checkCell.append(cellID - 1)
-           if ocb(cellID + 1) and (cellID + 1) not in checkedCell:
-               FOUND_MINES[cellID + 1] = MINES[cellID + 1]
-               checkCell.append(cellID + 1)
-           if ocb(cellID - 9) and (cellID - 9) not in checkedCell:
-               FOUND_MINES[cellID - 9] = MINES[cellID - 9]
-               checkCell.append(cellID - 9)
-           if ocb(cellID - 8) and (cellID - 8) not in checkedCell:
-               FOUND_MINES[cellID - 8] = MINES[cellID - 8]
-               checkCell.append(cellID - 8)
-           if ocb(cellID - 7) and (cellID - 7) not in checkedCell:
-               FOUND_MINES[cellID - 7] = MINES[cellID - 7]
-               checkCell.append(cellID - 7)
-           if ocb(cellID + 9) and (cellID + 9) not in checkedCell:
-               FOUND_MINES[cellID + 9] = MINES[cellID + 9]
-               checkCell.append(cellID + 9)
-           if ocb(cellID + 8) and (cellID + 8) not in checkedCell:
-               FOUND_MINES[cellID + 8] = MINES[cellID + 8]
-               checkCell.append(cellID + 8)
-           if ocb(cellID + 7) and (cellID + 7) not in checkedCell:
-               FOUND_MINES[cellID + 7] = MINES[cellID + 7]
-               checkCell.append(cellID + 7)
-           checkedCell.add(cellID)
-           checkCell.pop(0)
-       await updateList(ctx,status)
-       return (0,FOUND_MINES)
+MINE = -1
+
+#(width, height, mines) for the classic difficulty levels
+PRESETS = {
+   'beginner': (9, 9, 10),
+   'intermediate': (16, 16, 40),
+   'expert': (30, 16, 99),
+}
+
+#share of cells that are mines when no count is given, spanning the presets
+DENSITY = (0.12, 0.2)
+
+def neighbourCounts(mines, width, height):
+   """Count adjacent mines for every cell of a 0/1 grid in two passes.
+
+   The 3x3 box sum is separable: sum each cell with its left and right
+   neighbours, then sum those row sums with the rows above and below.
+   """
+   rows = []
+   for y in range(height):
+      row = mines[y * width:(y + 1) * width]
+      padded = [0] + list(row) + [0]
+      rows.append([a + b + c for a, b, c in zip(padded, padded[1:], padded[2:])])
+   blank = [0] * width
+   rows = [blank] + rows + [blank]
+   counts = []
+   for above, here, below in zip(rows, rows[1:], rows[2:]):
+      counts.extend(a + b + c for a, b, c in zip(above, here, below))
+   return [count - mine for count, mine in zip(counts, mines)]
+
+class MinesweeperGame:
+   """One board: mine counts and revealed flags, one byte per cell each.
+
+   ``hidden`` counts the safe cells not yet revealed, so checking for a
+   win is a single comparison.
+   """
+   __slots__ = ('width', 'height', 'board', 'shown', 'hidden')
+
+   def __init__(self, width=8, height=8, mines=None, rng=random):
+      self.width = width
+      self.height = height
+      cells = width * height
+      if mines is None:
+         mines = max(1, round(cells * rng.uniform(*DENSITY)))
+      mines = min(mines, cells - 1)
+      layout = bytearray(cells)
+      for mineid in rng.sample(range(cells), mines):
+         layout[mineid] = 1
+      self.board = array('b', neighbourCounts(layout, width, height))
+      for mineid, mine in enumerate(layout):
+         if mine:
+            self.board[mineid] = MINE
+      self.shown = bytearray(cells)
+      self.hidden = cells - mines
+
+   def neighbours(self, cell):
+      y, x = divmod(cell, self.width)
+      for dy in (-1, 0, 1):
+         if 0 <= y + dy < self.height:
+            for dx in (-1, 0, 1):
+               if (dy or dx) and 0 <= x + dx < self.width:
+                  yield cell + dy * self.width + dx
+
+   def symbol(self, cell, reveal=False):
+      if not (reveal or self.shown[cell]):
+         return MineObj.unknown
+      if self.board[cell] == MINE:
+         return MineObj.mine
+      return str(self.board[cell]) if self.board[cell] else MineObj.no
+
+   def render(self, reveal=False):
+      output = "```\n"
+      for j in range(self.height):
+         output += "".join(self.symbol(self.width * j + k, reveal) for k in range(self.width))
+         output += "\n"
+      return output + "```"
+
+   def reveal(self, x, y):
+      """Open the cell at 1-based column ``x``, row ``y``.
+
+      Returns 1 if it was a mine, 2 if that cleared the board,
+      otherwise 0.
+      """
+      cell = (y - 1) * self.width + x - 1
+      if self.board[cell] == MINE:
+         return 1
+      if not self.shown[cell]:
+         self.shown[cell] = 1
+         self.hidden -= 1
+         todo = deque((cell,))
+         while todo:
+            cell = todo.popleft()
+            if self.board[cell] == 0:
+               for n in self.neighbours(cell):
+                  if not self.shown[n]:
+                     self.shown[n] = 1
+                     self.hidden -= 1
+                     todo.append(n)
+      return 2 if self.hidden == 0 else 0
+
+def acceptor(width, height):
+   """Input filter for moves on a ``width`` by ``height`` board."""
+   pattern = re.compile("^([0-9]+) ([0-9]+)$")
+   def accept(m):
+      match = pattern.match(m.content)
+      return match is not None \
+         and 1 <= int(match.group(1)) <= width \
+         and 1 <= int(match.group(2)) <= height
+   return accept
+
+async def play(ctx, session, width=8, height=8, mines=None):
+   game = MinesweeperGame(width, height, mines)
+   status = livemsg.LiveMessage(await ctx.send(game.render()))
+   guesses = livemsg.DeleteBatcher(ctx.channel)
+   ans = 0
+   while ans == 0:
+      guess = await session.get()
+      guesses.delete(guess)
+      ans = game.reveal(*map(int, guess.content.split(" ")))
+      status.edit(game.render(reveal=ans == 1))
+   await status.close()
+   await guesses.close()
+   if ans == 1:
+      await ctx.send("Game over!")
    else:
-       return
-
-async def play(ctx):
-   global MINES,FOUND_MINES
-   setupMine()
-   status = await printList(ctx)
-   guess = await ctx.bot.wait_for('message',check=lambda m: m.channel == ctx.channel and re.match("^[1-8] [1-8]$",m.content))
-   inputStr = guess.content
-   await guess.delete()
-   ans=await checkCell(inputStr,ctx,status)
-   while ans[0] == 0 :
-       guess = await ctx.bot.wait_for('message',check=lambda m: m.channel == ctx.channel and re.match("^[1-8] [1-8]$",m.content))
-       inputStr = guess.content
-       await guess.delete()
-       ans=await checkCell(inputStr,ctx,status)
-       ans_str=str(list(map(str,FOUND_MINES)))
-       ans_str=ans_str.replace(MineObj.unknown,MineObj.mine)
-       mines_str=str(list(map(str,MINES)))
-       if ans[0] == 1:
-           break
-       elif ans_str == mines_str:
-           await ctx.send("You find all mines!")
-           break
-   return
+      await ctx.send("You find all mines!")
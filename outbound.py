@@ -0,0 +1,92 @@
+import asyncio
+from collections import Counter
+import discord as d
+import paging
+
+MESSAGE_LIMIT = 2000
+EMBED_FIELDS = 25
+EMBED_TOTAL = 6000
+FIELD_NAME = 256
+FIELD_VALUE = 1024
+
+def packText(items, sep='\n'):
+    """Join strings into as few messages of at most 2000 characters as possible."""
+    buf = ''
+    for item in items:
+        for piece in paging.chunks(item, MESSAGE_LIMIT, prefix='', suffix=''):
+            if buf and len(buf) + len(sep) + len(piece) > MESSAGE_LIMIT:
+                yield buf
+                buf = piece
+            else:
+                buf = buf + sep + piece if buf else piece
+    if buf:
+        yield buf
+
+def packFields(fields):
+    """Put (name, value) pairs into as few embeds as possible."""
+    embed = d.Embed()
+    total = 0
+    for name, value in fields:
+        name, value = name[:FIELD_NAME], value[:FIELD_VALUE]
+        if len(embed.fields) >= EMBED_FIELDS or total + len(name) + len(value) > EMBED_TOTAL:
+            yield embed
+            embed = d.Embed()
+            total = 0
+        embed.add_field(name=name, value=value, inline=False)
+        total += len(name) + len(value)
+    if embed.fields:
+        yield embed
+
+def pack(items, sep='\n'):
+    """Turn a mix of strings and (name, value) pairs into send() kwargs, in order."""
+    group = []
+    for item in items:
+        if group and isinstance(item, tuple) != isinstance(group[0], tuple):
+            yield from _packGroup(group, sep)
+            group = []
+        group.append(item)
+    yield from _packGroup(group, sep)
+
+def _packGroup(group, sep):
+    if group and isinstance(group[0], tuple):
+        for embed in packFields(group):
+            yield {'embed': embed}
+    elif group:
+        for content in packText(group, sep):
+            yield {'content': content}
+
+class Outbound:
+    """Per-channel send queue.
+
+    Output from concurrent commands in one channel goes out one message
+    at a time, in order. discord.py's HTTP client already waits out each
+    rate-limit bucket, so sending in sequence is all the pacing needed.
+    """
+    def __init__(self):
+        self.locks = {}
+        self.users = Counter()
+
+    async def send_many(self, destination, items, sep='\n'):
+        """Send strings and (name, value) pairs in as few messages as possible.
+
+        Strings are joined with ``sep`` into messages of up to 2000
+        characters; pairs become embed fields. Returns the sent messages.
+        """
+        key = getattr(destination, 'channel', destination).id
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        self.users[key] += 1
+        sent = []
+        try:
+            async with lock:
+                for kwargs in pack(items, sep):
+                    sent.append(await destination.send(**kwargs))
+        finally:
+            self.users[key] -= 1
+            if not self.users[key]:
+                del self.users[key]
+                del self.locks[key]
+        return sent
+
+OUTBOUND = Outbound()
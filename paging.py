@@ -0,0 +1,100 @@
+import asyncio
+import re
+import discord as d
+
+FENCE = '```'
+#a zero-width space after every backtick that another one follows
+BACKTICKS = re.compile('`(?=`)')
+
+def chunks(text, size=2000, prefix=FENCE + '\n', suffix=FENCE):
+    """Lazily split ``text`` into blocks of at most ``size`` characters.
+
+    Blocks break at line ends where possible. Each one is wrapped in
+    ``prefix``/``suffix`` (a code block by default), and fences inside
+    the text are broken up so they cannot close the block early.
+    """
+    room = size - len(prefix) - len(suffix)
+    buf = []
+    used = 0
+    for line in text.splitlines(True):
+        if FENCE in suffix:
+            line = BACKTICKS.sub('`\u200b', line)
+        while line:
+            if used + len(line) > room and buf:
+                yield prefix + ''.join(buf) + suffix
+                buf = []
+                used = 0
+            piece, line = line[:room], line[room:]
+            buf.append(piece)
+            used += len(piece)
+    yield prefix + ''.join(buf) + suffix
+
+class Pager:
+    """Shows one page at a time in a single message, turned by reactions.
+
+    ``pages`` may be any iterable; it is only consumed as far as the
+    reader goes. Only the invoker can turn pages, for ``timeout``
+    seconds after the last turn.
+    """
+    FIRST = '⏮'
+    PREV = '◀'
+    NEXT = '▶'
+    LAST = '⏭'
+    STOP = '⏹'
+
+    def __init__(self, ctx, pages, timeout=120.0):
+        self.ctx = ctx
+        self.pages = iter(pages)
+        self.seen = []
+        self.done = False
+        self.timeout = timeout
+
+    def page(self, i):
+        """Return page ``i`` (clamped to what exists) and its index."""
+        while not self.done and i >= len(self.seen):
+            try:
+                self.seen.append(next(self.pages))
+            except StopIteration:
+                self.done = True
+        i = max(0, min(i, len(self.seen) - 1))
+        return i, self.seen[i]
+
+    async def run(self):
+        i, content = self.page(0)
+        msg = await self.ctx.send(content)
+        self.page(1)
+        if len(self.seen) < 2:
+            return msg
+        for emoji in (self.FIRST, self.PREV, self.NEXT, self.LAST, self.STOP):
+            await msg.add_reaction(emoji)
+        check = lambda r, u: r.message.id == msg.id and u == self.ctx.author
+        while 1:
+            try:
+                reaction, user = await self.ctx.bot.wait_for(
+                    'reaction_add', check=check, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                break
+            emoji = str(reaction.emoji)
+            if emoji == self.STOP:
+                break
+            target = {
+                self.FIRST: 0,
+                self.PREV: i - 1,
+                self.NEXT: i + 1,
+                self.LAST: float('inf'),
+            }.get(emoji)
+            try:
+                await msg.remove_reaction(reaction.emoji, user)
+            except d.HTTPException:
+                pass
+            if target is None:
+                continue
+            j, content = self.page(target)
+            if j != i:
+                i = j
+                await msg.edit(content=content)
+        try:
+            await msg.clear_reactions()
+        except d.HTTPException:
+            pass
+        return msg
@@ -0,0 +1,66 @@
+import asyncio
+import random
+import time
+
+class ProjectPool:
+    """Random project IDs checked to exist ahead of time.
+
+    ``probes`` background tasks each pick random IDs up to the project
+    count (refetched every ``countTTL`` seconds) and ask ``exists`` about
+    them, until ``size`` good IDs are waiting. Taking one wakes a task
+    to find a replacement, so the upstream sees a steady trickle of
+    probes instead of bursts of them per command.
+    """
+    def __init__(self, count, exists, size=20, probes=4, countTTL=3600.0,
+                 retry=10.0, rng=random):
+        self.count = count
+        self.exists = exists
+        self.size = size
+        self.probes = probes
+        self.countTTL = countTTL
+        self.retry = retry
+        self.rng = rng
+        self.ids = None
+        self.countLock = None
+        self.workers = []
+        self.total = None
+        self.totalAt = 0
+
+    def start(self):
+        """Start filling the pool, if that is not happening already."""
+        if self.workers:
+            return
+        if self.ids is None:
+            self.ids = asyncio.Queue(self.size)
+            self.countLock = asyncio.Lock()
+        self.workers = [asyncio.ensure_future(self._probe()) for _ in range(self.probes)]
+
+    def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+
+    async def get(self):
+        """An existing project ID; only waits if the pool has run dry."""
+        self.start()
+        return await self.ids.get()
+
+    async def projectCount(self):
+        #one refetch at a time; the other probes wait for its answer
+        async with self.countLock:
+            if self.total is None or time.monotonic() > self.totalAt + self.countTTL:
+                self.total = await self.count()
+                self.totalAt = time.monotonic()
+        return self.total
+
+    async def _probe(self):
+        while True:
+            try:
+                pid = self.rng.randint(1, await self.projectCount())
+                if await self.exists(pid):
+                    await self.ids.put(pid)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                #upstream trouble; back off rather than hammer it
+                await asyncio.sleep(self.retry)
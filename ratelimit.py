@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from discord.ext import commands as c
+
+class RateLimited(c.CheckFailure):
+    """Raised when a limiter has no token free; ``limiters`` are the ones that had none."""
+    def __init__(self, retry_after, limiters=()):
+        self.retry_after = retry_after
+        self.limiters = limiters
+        super().__init__('Slow down! Try again in {:.1f} seconds.'.format(retry_after))
+
+    @property
+    def byUser(self):
+        """Whether the invoker's own bucket was empty, not just a shared one."""
+        return any(limiter.scope == 'user' for limiter in self.limiters)
+
+SCOPES = {
+    'user': lambda ctx: ctx.author.id,
+    'channel': lambda ctx: ctx.channel.id,
+    'guild': lambda ctx: ctx.guild.id if ctx.guild is not None else ctx.channel.id,
+    'command': lambda ctx: None,
+}
+
+class Limiter:
+    """Token buckets holding ``rate`` tokens that refill over ``per`` seconds.
+
+    There is one bucket per user, channel or guild (or just one for the
+    ``command`` scope). At most ``maxKeys`` buckets are kept; the least
+    recently used is dropped first, which at worst hands that key a full
+    bucket again. Share one Limiter between commands that hit the same
+    upstream to give them a common budget.
+    """
+    def __init__(self, rate, per, scope='user', maxKeys=4096):
+        self.rate = rate
+        self.fill = rate / per
+        self.scope = scope
+        self.keyOf = SCOPES[scope]
+        self.maxKeys = maxKeys
+        self.buckets = OrderedDict()
+
+    def _bucket(self, key):
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.rate, now]
+            while len(self.buckets) > self.maxKeys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.fill)
+            bucket[1] = now
+        return bucket
+
+    def peek(self, key):
+        """Seconds until ``key`` has a token free (0 if it has one now)."""
+        bucket = self._bucket(key)
+        return max(0, (1 - bucket[0]) / self.fill)
+
+    def consume(self, key):
+        """Take a token; return 0 on success or the seconds until one is free."""
+        wait = self.peek(key)
+        if not wait:
+            self.buckets[key][0] -= 1
+        return wait
+
+def _check(pairs):
+    """Raise RateLimited if any of the ``(limiter, key)`` pairs has no token free."""
+    waits = [(limiter.peek(key), limiter) for limiter, key in pairs]
+    empty = tuple(limiter for wait, limiter in waits if wait > 0)
+    if empty:
+        raise RateLimited(max(wait for wait, _ in waits), empty)
+
+def limit(*limiters):
+    """Command check that a token is free in each limiter.
+
+    The check only looks: discord.py also runs checks when building
+    $help, so the tokens are taken by take() once the command really
+    runs.
+    """
+    def predicate(ctx):
+        _check([(limiter, limiter.keyOf(ctx)) for limiter in limiters])
+        return True
+    predicate.limiters = limiters
+    return c.check(predicate)
+
+def take(ctx):
+    """Take a token from every limiter on ``ctx.command``; call before invoking.
+
+    All limiters must have a token free before any is taken, so a
+    rejection by one does not use up the others.
+    """
+    pairs = [(limiter, limiter.keyOf(ctx))
+             for check in ctx.command.checks
+             for limiter in getattr(check, 'limiters', ())]
+    #another invocation may have taken the last token since the check ran
+    _check(pairs)
+    for limiter, key in pairs:
+        limiter.consume(key)
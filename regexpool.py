@@ -0,0 +1,128 @@
+import asyncio
+import multiprocessing
+import os
+import re
+from functools import lru_cache
+try:
+    import resource
+except ImportError: #Windows
+    resource = None
+
+MAX_FINDALL = 500
+
+#fork is unsafe once the bot has threads, so workers are started from a
+#forkserver (which has only this module loaded) where there is one
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    CONTEXT = multiprocessing.get_context('forkserver')
+    CONTEXT.set_forkserver_preload([__name__])
+else:
+    CONTEXT = multiprocessing.get_context('spawn')
+
+class RegexError(Exception):
+    pass
+
+class RegexTimeout(RegexError):
+    pass
+
+@lru_cache(maxsize=256)
+def _compile(pattern, flags):
+    if flags is not None:
+        pattern = '(?' + flags.lower().replace('l', 'L') + ')(?:' + pattern + ')'
+    return re.compile(pattern)
+
+def _search(exp, string):
+    m = exp.search(string)
+    if m is None:
+        return None
+    return [m.group(0)] + [group or '' for group in m.groups()]
+
+def _findall(exp, string):
+    results = []
+    for m in exp.finditer(string):
+        results.append([m.group(0)] + [group or '' for group in m.groups()])
+        if len(results) >= MAX_FINDALL:
+            break
+    return results
+
+OPS = {'search': _search, 'findall': _findall}
+
+def _limitMemory(memLimit):
+    if resource is None or not memLimit:
+        return
+    try:
+        #the worker already holds the interpreter and this module
+        with open('/proc/self/statm') as f:
+            base = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        base = 0
+    resource.setrlimit(resource.RLIMIT_AS, (base + memLimit, base + memLimit))
+
+def _serve(conn, memLimit):
+    _limitMemory(memLimit)
+    while True:
+        try:
+            op, pattern, string, flags = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, OPS[op](_compile(pattern, flags), string)))
+        except Exception as exc:
+            conn.send((False, '{}: {}'.format(type(exc).__name__, exc)))
+
+class Worker:
+    def __init__(self, memLimit):
+        self.conn, child = CONTEXT.Pipe()
+        self.proc = CONTEXT.Process(target=_serve, args=(child, memLimit), daemon=True)
+        self.proc.start()
+        child.close()
+        self.jobs = 0
+
+    def kill(self):
+        self.proc.terminate()
+        self.proc.join()
+        self.conn.close()
+
+class RegexPool:
+    """Runs user-supplied regexes in worker processes.
+
+    At most ``size`` evaluations run at once. A worker that takes longer
+    than ``timeout`` seconds is killed and replaced, and workers are
+    recycled after ``maxJobs`` evaluations. Each worker may grow its
+    address space by ``memLimit`` bytes (where the platform supports it).
+    """
+    def __init__(self, size=2, timeout=2.0, memLimit=256 * 1024 * 1024, maxJobs=1000):
+        self.timeout = timeout
+        self.memLimit = memLimit
+        self.maxJobs = maxJobs
+        self.sem = asyncio.Semaphore(size)
+        self.idle = []
+
+    async def run(self, op, pattern, string, flags=None):
+        """Run ``op`` ('search' or 'findall') and return its plain-data result."""
+        loop = asyncio.get_event_loop()
+        async with self.sem:
+            worker = self.idle.pop() if self.idle else Worker(self.memLimit)
+            try:
+                worker.conn.send((op, pattern, string, flags))
+                ready = await loop.run_in_executor(None, worker.conn.poll, self.timeout)
+                if not ready:
+                    raise RegexTimeout('evaluation took longer than {}s'.format(self.timeout))
+                try:
+                    ok, value = worker.conn.recv()
+                except EOFError:
+                    raise RegexError('worker exited unexpectedly')
+            except BaseException:
+                worker.kill()
+                raise
+            worker.jobs += 1
+            if worker.jobs >= self.maxJobs:
+                worker.kill()
+            else:
+                self.idle.append(worker)
+        if not ok:
+            raise RegexError(value)
+        return value
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().kill()
@@ -0,0 +1,66 @@
+import asyncio
+
+class Occupied(Exception):
+    pass
+
+class Route:
+    """A queue of the messages sent to one game.
+
+    Use as a context manager so the route is always released.
+    """
+    def __init__(self, router, key, accept, maxsize):
+        self.router = router
+        self.key = key
+        self.accept = accept
+        self.queue = asyncio.Queue(maxsize)
+
+    async def get(self, timeout=None):
+        """Wait for the next accepted message."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        if self.router.routes.get(self.key) is self:
+            del self.router.routes[self.key]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+class Router:
+    """Hands incoming messages straight to the game listening on their channel.
+
+    Routes are keyed by (channel ID, author ID), where an author ID of
+    None accepts anyone in the channel, so each message costs two dict
+    lookups and one ``accept`` call however many games are running.
+    """
+    def __init__(self):
+        self.routes = {}
+
+    def listen(self, channelId, authorId=None, accept=None, maxsize=16):
+        """Claim input on a channel (optionally from one author only).
+
+        Raises Occupied if that input is already claimed.
+        """
+        key = (channelId, authorId)
+        if key in self.routes:
+            raise Occupied(key)
+        route = self.routes[key] = Route(self, key, accept, maxsize)
+        return route
+
+    def dispatch(self, message):
+        """Queue ``message`` for its route; return whether one took it."""
+        channelId = message.channel.id
+        route = self.routes.get((channelId, message.author.id)) \
+            or self.routes.get((channelId, None))
+        if route is None or (route.accept is not None and not route.accept(message)):
+            return False
+        try:
+            route.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            #the game is not keeping up; drop the input rather than buffer it
+            return False
+        return True
+
+ROUTER = Router()
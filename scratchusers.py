@@ -0,0 +1,42 @@
+import asyncio
+import time
+from singleflight import SingleFlight
+from wikicache import LRUCache
+
+class MessageCounts:
+    """Scratch users' unread message counts, cached for a short while.
+
+    ``fetch(username)`` returns a user's count, or None if there is no
+    such user. Counts are kept for ``ttl`` seconds and "no such user" for
+    ``missingTTL`` seconds, for at most ``maxEntries`` users. Concurrent
+    lookups of one name share a single request, and no more than
+    ``parallel`` requests run at once.
+    """
+    def __init__(self, fetch, ttl=60.0, missingTTL=300.0, maxEntries=4096, parallel=4):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.missingTTL = missingTTL
+        self.entries = LRUCache(maxEntries)
+        self.flights = SingleFlight()
+        self.slots = asyncio.Semaphore(parallel)
+
+    async def _fetch(self, key, username):
+        async with self.slots:
+            count = await self.fetch(username)
+        self.entries.put(key, count, 1)
+        return count
+
+    async def get(self, username):
+        """The message count of ``username``, or None if there is no such user."""
+        key = username.lower()
+        cached = self.entries.get(key)
+        if cached is not None:
+            count, storedAt = cached
+            if time.time() - storedAt < (self.ttl if count is not None else self.missingTTL):
+                return count
+        return await self.flights.run(key, self._fetch, key, username)
+
+    async def getMany(self, usernames):
+        """Look up several users at once; failed lookups come back as exceptions."""
+        return await asyncio.gather(*(self.get(name) for name in usernames),
+                                    return_exceptions=True)
@@ -1,37 +1,6 @@
 import json
-
-def clearAllWarnings():
-    try:
-        with open("blocklist.json", "r") as jf:
-            warndata=json.load(jf)
-            warndata["warning"] = [""]
-            jf.seek(0)
-        with open("blocklist.json", "w") as jf:
-            json.dump(warndata, jf)
-    except json.decoder.JSONDecodeError:
-        pass
-
-def setWarnType(name,warntype,remove=False):
-    if warntype not in ['warning','alert','block','no']:
-        return
-    else:
-        try:
-            with open("blocklist.json", "r") as jf:
-                warndata=json.loads(jf.read())
-            if name not in warndata[warntype] and (not remove):
-                warndata[warntype].append(name)
-                if warntype == 'alert' and name in warndata["warning"]:
-                    warndata["warning"].remove(name)
-                if warntype == 'block' and name in warndata["warning"]:
-                    warndata["warning"].remove(name)
-                if warntype == 'block' and name in warndata["alert"]:
-                    warndata["alert"].remove(name)
-            if name in warndata[warntype] and remove:
-                warndata[warntype].remove(name)
-            with open("blocklist.json", "w") as jf:
-                json.dump(warndata,jf)
-        except json.decoder.JSONDecodeError:
-            pass
+import os
+import threading
 
 class WarnType:
     block = 3
@@ -39,19 +8,184 @@ class WarnType:
     warning = 1
     no = 0
 
-def getWarnType(name):
-    with open("blocklist.json","r") as jf:
+WARN_TYPES = ('warning', 'alert', 'block')
+
+class Blocklist:
+    """Moderation state held in memory as sets of user IDs.
+
+    Names left in the snapshot by the old name-keyed blocklist are kept
+    apart in ``legacy`` until the user is banned or unbanned by ID.
+    Changes are applied to the sets immediately and queued for the
+    append-only journal; ``flush`` writes the queue out and ``compact``
+    folds the journal into the snapshot file. ``lock`` guards the sets
+    and the queue and is never held during file I/O; ``writing`` keeps
+    one writer at a time, and a failed write leaves its changes queued.
+    """
+    def __init__(self, snapshot="blocklist.json", journal="blocklist.journal",
+                 compactEvery=200):
+        self.snapshot = snapshot
+        self.journal = journal
+        self.compactEvery = compactEvery
+        self.sets = {warntype: set() for warntype in WARN_TYPES}
+        self.legacy = {warntype: set() for warntype in WARN_TYPES}
+        self.pending = []
+        self.journaled = 0
+        self.lock = threading.Lock()
+        self.writing = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def userId(uid):
+        """``uid`` as an int, or None if it is not a user ID."""
+        try:
+            return int(uid)
+        except (TypeError, ValueError):
+            return None
+
+    def load(self):
+        try:
+            with open(self.snapshot, "r") as jf:
+                warndata = json.load(jf)
+        except (OSError, json.decoder.JSONDecodeError):
+            warndata = {}
+        for warntype in WARN_TYPES:
+            self.sets[warntype] = set()
+            self.legacy[warntype] = set()
+            for entry in warndata.get(warntype, ()):
+                uid = self.userId(entry)
+                if uid is not None:
+                    self.sets[warntype].add(uid)
+                elif isinstance(entry, str) and entry:
+                    self.legacy[warntype].add(entry)
+        self.journaled = 0
+        try:
+            with open(self.journal, "r") as jf:
+                for line in jf:
+                    try:
+                        entry = json.loads(line)
+                    except json.decoder.JSONDecodeError:
+                        #a torn final line from a crash mid-write
+                        continue
+                    self._apply(entry)
+                    self.journaled += 1
+        except OSError:
+            pass
+
+    def _apply(self, entry):
+        op = entry["op"]
+        if op == "forget":
+            for names in self.legacy.values():
+                names.discard(entry["name"])
+            return
+        warntype = entry["type"]
+        if op == "clear":
+            self.sets[warntype].clear()
+            self.legacy[warntype].clear()
+        elif op == "remove":
+            self.sets[warntype].discard(entry["id"])
+        else:
+            self.sets[warntype].add(entry["id"])
+            if warntype in ('alert', 'block'):
+                self.sets["warning"].discard(entry["id"])
+            if warntype == 'block':
+                self.sets["alert"].discard(entry["id"])
+
+    def _record(self, entry):
+        with self.lock:
+            self._apply(entry)
+            self.pending.append(entry)
+
+    def setWarnType(self, uid, warntype, remove=False):
+        uid = self.userId(uid)
+        if warntype not in WARN_TYPES or uid is None:
+            return
+        if remove:
+            if uid in self.sets[warntype]:
+                self._record({"op": "remove", "type": warntype, "id": uid})
+        elif uid not in self.sets[warntype]:
+            self._record({"op": "add", "type": warntype, "id": uid})
+
+    def clear(self, warntype):
+        if warntype in WARN_TYPES:
+            self._record({"op": "clear", "type": warntype})
+
+    def forgetName(self, name):
+        """Drop ``name`` from the legacy entries, once its user is handled by ID."""
+        if any(name in names for names in self.legacy.values()):
+            self._record({"op": "forget", "name": name})
+
+    def isLegacyBlocked(self, name):
+        return name in self.legacy["block"]
+
+    def getWarnType(self, uid):
+        uid = self.userId(uid)
+        if uid in self.sets["block"]:
+            return WarnType.block
+        elif uid in self.sets["alert"]:
+            return WarnType.alert
+        elif uid in self.sets["warning"]:
+            return WarnType.warning
+        return WarnType.no
+
+    def _requeue(self, pending):
+        with self.lock:
+            self.pending[:0] = pending
+
+    def flush(self):
+        """Append queued changes to the journal; compact if it grew too long."""
+        with self.writing:
+            with self.lock:
+                pending, self.pending = self.pending, []
+            if pending:
+                try:
+                    with open(self.journal, "a") as jf:
+                        jf.write("".join(json.dumps(entry) + "\n" for entry in pending))
+                except Exception:
+                    self._requeue(pending)
+                    raise
+                self.journaled += len(pending)
+            if self.journaled >= self.compactEvery:
+                self._compact()
+
+    def compact(self):
+        with self.writing:
+            self._compact()
+
+    def _compact(self):
+        #the snapshot covers everything queued so far, so the queue goes with it
+        with self.lock:
+            pending, self.pending = self.pending, []
+            ids = {warntype: list(self.sets[warntype]) for warntype in WARN_TYPES}
+            names = {warntype: list(self.legacy[warntype]) for warntype in WARN_TYPES}
+        warndata = {warntype: sorted(ids[warntype]) + sorted(names[warntype])
+                    for warntype in WARN_TYPES}
+        tmp = self.snapshot + ".tmp"
         try:
-            warndata=json.loads(jf.read())
-            if name in warndata["block"]:
-                return WarnType.block
-            elif name in warndata["alert"]:
-                return WarnType.alert
-            elif name in warndata["warning"]:
-                return WarnType.warning
-            else:
-                return WarnType.no
-        except json.decoder.JSONDecodeError:
-            return WarnType.no
+            with open(tmp, "w") as jf:
+                json.dump(warndata, jf)
+            os.replace(tmp, self.snapshot)
+            with open(self.journal, "w"):
+                pass
+        except Exception:
+            self._requeue(pending)
+            raise
+        self.journaled = 0
+
+BLOCKLIST = Blocklist()
+
+def clearAllWarnings():
+    BLOCKLIST.clear("warning")
+
+def setWarnType(uid,warntype,remove=False):
+    BLOCKLIST.setWarnType(uid,warntype,remove)
+
+def getWarnType(uid):
+    return BLOCKLIST.getWarnType(uid)
+
+def forgetName(name):
+    BLOCKLIST.forgetName(name)
+
+def isLegacyBlocked(name):
+    return BLOCKLIST.isLegacyBlocked(name)
 
 isBlocked=lambda n:getWarnType(n)==WarnType.block
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import Counter
+import router
+
+class SessionLimit(Exception):
+    pass
+
+class SessionTimeout(Exception):
+    pass
+
+class Session:
+    """One running game: its channel, its input routes and its deadlines.
+
+    ``get`` raises SessionTimeout once nobody has sent input for the
+    manager's ``idle`` seconds or the game has run for ``absolute``
+    seconds. Leaving the ``with`` block releases every route and the
+    session's slot.
+    """
+    def __init__(self, manager, ctx, kind):
+        self.manager = manager
+        self.kind = kind
+        self.channel = ctx.channel
+        self.guildId = ctx.guild.id if ctx.guild is not None else None
+        self.owner = ctx.author
+        self.started = self.active = time.monotonic()
+        self.routes = []
+
+    @property
+    def route(self):
+        """The route for input in the game's channel."""
+        return self.routes[0]
+
+    def listen(self, channelId=None, authorId=None, accept=None):
+        """Claim another input route (the first one is the game's channel)."""
+        if channelId is None:
+            channelId = self.channel.id
+        route = router.ROUTER.listen(channelId, authorId, accept)
+        self.routes.append(route)
+        return route
+
+    async def get(self, route=None):
+        """Wait for the next message on ``route`` (the channel by default)."""
+        if route is None:
+            route = self.route
+        left = self.started + self.manager.absolute - time.monotonic()
+        try:
+            msg = await route.get(max(0, min(self.manager.idle, left)))
+        except asyncio.TimeoutError:
+            if left <= self.manager.idle:
+                raise SessionTimeout('This {} game has gone on too long, so it has ended.'.format(self.kind))
+            raise SessionTimeout('Nobody played this {} game for a while, so it has ended.'.format(self.kind))
+        self.active = time.monotonic()
+        return msg
+
+    def close(self):
+        for route in self.routes:
+            route.close()
+        self.routes = []
+        if self.manager.sessions.get(self.channel.id) is self:
+            del self.manager.sessions[self.channel.id]
+            if self.guildId is not None:
+                self.manager.perGuild[self.guildId] -= 1
+                if not self.manager.perGuild[self.guildId]:
+                    del self.manager.perGuild[self.guildId]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+class SessionManager:
+    """Keeps track of running games and caps how many may run at once.
+
+    Games are keyed by channel. Each DM channel belongs to one user, so
+    DM games only count towards ``maxTotal``, not a per-server cap.
+    """
+    def __init__(self, idle=300.0, absolute=3600.0, maxPerGuild=5, maxTotal=500):
+        self.idle = idle
+        self.absolute = absolute
+        self.maxPerGuild = maxPerGuild
+        self.maxTotal = maxTotal
+        self.sessions = {}
+        self.perGuild = Counter()
+
+    def open(self, ctx, kind, accept=None):
+        """Start a ``kind`` game in the invoking channel.
+
+        Raises router.Occupied if the channel already has a game and
+        SessionLimit if too many games are running.
+        """
+        if ctx.channel.id in self.sessions:
+            raise router.Occupied(ctx.channel.id)
+        if len(self.sessions) >= self.maxTotal:
+            raise SessionLimit('Too many games are going on right now! Try again later.')
+        session = Session(self, ctx, kind)
+        if session.guildId is not None and self.perGuild[session.guildId] >= self.maxPerGuild:
+            raise SessionLimit('This server already has {} games going on!'.format(self.maxPerGuild))
+        session.listen(accept=accept)
+        self.sessions[ctx.channel.id] = session
+        if session.guildId is not None:
+            self.perGuild[session.guildId] += 1
+        return session
+
+    def inGuild(self, guildId):
+        return [s for s in self.sessions.values() if s.guildId == guildId]
+
+    def visibleTo(self, ctx):
+        """The games in the invoking server, or in DMs only the invoker's own."""
+        if ctx.guild is not None:
+            return self.inGuild(ctx.guild.id)
+        session = self.sessions.get(ctx.channel.id)
+        return [session] if session is not None else []
@@ -0,0 +1,29 @@
+import asyncio
+
+class SingleFlight:
+    """At most one task in flight per key.
+
+    Asking for a key that is already being worked on joins the running
+    task instead of starting another. The task is forgotten once it
+    finishes, so the next request starts afresh.
+    """
+    def __init__(self):
+        self.pending = {}
+
+    def _done(self, key, fut):
+        del self.pending[key]
+        if not fut.cancelled():
+            #the callers may all have gone away
+            fut.exception()
+
+    def start(self, key, func, *args):
+        """Start (or join) the task for ``key``, running ``func(*args)``."""
+        fut = self.pending.get(key)
+        if fut is None:
+            fut = self.pending[key] = asyncio.ensure_future(func(*args))
+            fut.add_done_callback(lambda f: self._done(key, f))
+        return fut
+
+    async def run(self, key, func, *args):
+        """Like start(), but wait for the result; a caller giving up does not stop the task."""
+        return await asyncio.shield(self.start(key, func, *args))
@@ -0,0 +1,23 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+class SQLiteWorker:
+    """A SQLite connection used from one worker thread.
+
+    run() queues a call on that thread, so the event loop never waits on
+    the database, and calls happen one at a time in the order queued.
+    ``conn`` may also be used directly before any call is queued.
+    """
+    def __init__(self, path):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+    def run(self, func, *args):
+        """Call ``func(*args)`` on the worker thread; return an awaitable result."""
+        return asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        """Finish the queued calls and close the connection."""
+        self.executor.shutdown()
+        self.conn.close()
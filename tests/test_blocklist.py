@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import secret
+from secret import WarnType
+
+class BlocklistTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.dir, 'blocklist.json')
+        self.journal = os.path.join(self.dir, 'blocklist.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def blocklist(self, compactEvery=200):
+        return secret.Blocklist(self.snapshot, self.journal, compactEvery)
+
+    def writeSnapshot(self, warndata):
+        with open(self.snapshot, 'w') as f:
+            json.dump(warndata, f)
+
+    def test_journal_replay(self):
+        b = self.blocklist()
+        b.setWarnType(1, 'warning')
+        b.setWarnType(2, 'block')
+        b.setWarnType(1, 'alert')
+        b.setWarnType(2, 'block', remove=True)
+        b.flush()
+        self.assertFalse(os.path.exists(self.snapshot))
+        b = self.blocklist()
+        self.assertEqual(b.getWarnType(1), WarnType.alert)
+        self.assertEqual(b.getWarnType(2), WarnType.no)
+        self.assertEqual(b.journaled, 4)
+
+    def test_compaction(self):
+        b = self.blocklist(compactEvery=3)
+        for uid in (3, 1, 2):
+            b.setWarnType(uid, 'block')
+        b.flush()
+        with open(self.snapshot) as f:
+            self.assertEqual(json.load(f), {'warning': [], 'alert': [], 'block': [1, 2, 3]})
+        self.assertEqual(os.path.getsize(self.journal), 0)
+        self.assertEqual(b.journaled, 0)
+        b.setWarnType(4, 'warning')
+        b.compact()
+        b = self.blocklist()
+        self.assertEqual(b.sets['block'], {1, 2, 3})
+        self.assertEqual(b.getWarnType(4), WarnType.warning)
+
+    def test_torn_last_line(self):
+        b = self.blocklist()
+        b.setWarnType(1, 'block')
+        b.flush()
+        with open(self.journal, 'a') as f:
+            f.write('{"op": "add", "type": "bl')
+        b = self.blocklist()
+        self.assertEqual(b.getWarnType(1), WarnType.block)
+        self.assertEqual(b.journaled, 1)
+
+    def test_failed_flush_keeps_entries(self):
+        b = self.blocklist()
+        b.setWarnType(1, 'block')
+        with mock.patch('builtins.open', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                b.flush()
+        self.assertEqual(len(b.pending), 1)
+        b.setWarnType(2, 'block')
+        b.flush()
+        self.assertEqual(b.pending, [])
+        self.assertEqual(self.blocklist().sets['block'], {1, 2})
+
+    def test_failed_compaction_keeps_entries(self):
+        b = self.blocklist()
+        b.setWarnType(1, 'block')
+        with mock.patch('os.replace', side_effect=OSError('read-only')):
+            with self.assertRaises(OSError):
+                b.compact()
+        self.assertEqual(len(b.pending), 1)
+        b.flush()
+        self.assertEqual(self.blocklist().getWarnType(1), WarnType.block)
+
+    def test_ids_are_normalised(self):
+        b = self.blocklist()
+        b.setWarnType('123', 'block')
+        self.assertEqual(b.getWarnType(123), WarnType.block)
+        self.assertEqual(b.getWarnType('123'), WarnType.block)
+        self.assertEqual(b.getWarnType('someone'), WarnType.no)
+
+    def test_legacy_names_kept_until_forgotten(self):
+        self.writeSnapshot({'block': ['', 'someone', '42'], 'warning': ['other'], 'alert': []})
+        b = self.blocklist()
+        self.assertEqual(b.sets['block'], {42})
+        self.assertTrue(b.isLegacyBlocked('someone'))
+        self.assertEqual(b.legacy['warning'], {'other'})
+        b.compact()
+        b = self.blocklist()
+        self.assertTrue(b.isLegacyBlocked('someone'))
+        b.setWarnType(7, 'block')
+        b.forgetName('someone')
+        b.flush()
+        b = self.blocklist()
+        self.assertFalse(b.isLegacyBlocked('someone'))
+        self.assertEqual(b.sets['block'], {7, 42})
+
+if __name__ == '__main__':
+    unittest.main()
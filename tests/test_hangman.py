@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hangman
+
+class HangmanGameTest(unittest.TestCase):
+    def play(self, word, letters):
+        game = hangman.HangmanGame(word)
+        for letter in letters:
+            game.guess(letter)
+        return game
+
+    def test_only_letters_are_hidden(self):
+        game = hangman.HangmanGame('Snake_case 2')
+        self.assertEqual(''.join(game.shown), '__________ 2')
+        self.assertEqual(game.hidden, 9)
+
+    def test_underscore_in_word_can_be_won(self):
+        game = self.play('snake_case', 'snakec')
+        self.assertTrue(game.won)
+        self.assertEqual(''.join(game.shown), 'snake_case')
+
+    def test_guess_reveals_every_position(self):
+        game = hangman.HangmanGame('banana')
+        self.assertTrue(game.guess('a'))
+        self.assertEqual(''.join(game.shown), '_a_a_a')
+        self.assertEqual(game.hidden, 3)
+
+    def test_repeated_guesses_cost_nothing(self):
+        game = self.play('banana', 'aazz')
+        self.assertEqual(game.missed, ['z'])
+        self.assertEqual(game.hidden, 3)
+
+    def test_lost_after_every_shape(self):
+        game = self.play('a', 'bcdefghi')
+        self.assertTrue(game.lost)
+        self.assertFalse(game.won)
+        self.assertIn(hangman.SHAPES[-1], game.status())
+
+if __name__ == '__main__':
+    unittest.main()
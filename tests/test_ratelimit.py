@@ -0,0 +1,117 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import ratelimit
+
+def loadBot():
+    #importing the bot only defines it; nothing is opened until setup()
+    spec = importlib.util.spec_from_file_location('kenny2automate_bot', os.path.join(ROOT, '__main__.py'))
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    return bot
+
+class Escalation:
+    def __init__(self):
+        self.calls = []
+
+    async def get(self, uid, kind):
+        self.calls.append(('get', uid, kind))
+        return 0
+
+    async def bump(self, uid, kind):
+        self.calls.append(('bump', uid, kind))
+        return 1
+
+    async def reset(self, uid, kind):
+        self.calls.append(('reset', uid, kind))
+
+class Channel:
+    def __init__(self):
+        self.id = 2
+        self.sent = []
+
+    async def send(self, content=None, embed=None):
+        self.sent.append(content)
+
+class User:
+    def __init__(self):
+        self.id = 1
+        self.name = 'someone'
+        self.dm_channel = Channel()
+
+class Context:
+    def __init__(self, command):
+        self.author = User()
+        self.channel = Channel()
+        self.guild = None
+        self.command = command
+
+    async def send(self, content=None, embed=None):
+        await self.channel.send(content)
+
+class LimiterTest(unittest.TestCase):
+    def test_peek_does_not_take(self):
+        limiter = ratelimit.Limiter(1, 10)
+        self.assertEqual(limiter.peek(1), 0)
+        self.assertEqual(limiter.consume(1), 0)
+        self.assertGreater(limiter.consume(1), 0)
+
+    def test_rejection_names_empty_limiters(self):
+        own, shared = ratelimit.Limiter(5, 10), ratelimit.Limiter(1, 10, 'command')
+        shared.consume(None)
+        with self.assertRaises(ratelimit.RateLimited) as cm:
+            ratelimit._check([(own, 1), (shared, None)])
+        self.assertEqual(cm.exception.limiters, (shared,))
+        self.assertFalse(cm.exception.byUser)
+        for _ in range(5):
+            own.consume(1)
+        with self.assertRaises(ratelimit.RateLimited) as cm:
+            ratelimit._check([(own, 1), (shared, None)])
+        self.assertTrue(cm.exception.byUser)
+
+class WarningTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bot = loadBot()
+
+    def reject(self, *limiters):
+        for limiter in limiters:
+            limiter.consume(limiter.keyOf(self.ctx))
+        try:
+            ratelimit._check([(limiter, limiter.keyOf(self.ctx)) for limiter in limiters])
+        except ratelimit.RateLimited as exc:
+            return exc
+        self.fail('not rejected')
+
+    def handle(self, error):
+        escalation = Escalation()
+        with mock.patch.object(self.bot, 'ESCALATION', escalation, create=True), \
+                mock.patch.object(self.bot.secret, 'setWarnType'):
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.bot.on_command_error(self.ctx, error))
+            finally:
+                loop.close()
+        return escalation.calls
+
+    def setUp(self):
+        self.ctx = Context(mock.Mock(qualified_name='test'))
+
+    def test_shared_budget_does_not_escalate(self):
+        for scope in ('command', 'channel', 'guild'):
+            error = self.reject(ratelimit.Limiter(1, 10, scope))
+            self.assertEqual(self.handle(error), [])
+            self.assertEqual(self.ctx.channel.sent[-1], str(error))
+
+    def test_own_budget_escalates(self):
+        error = self.reject(ratelimit.Limiter(1, 10), ratelimit.Limiter(1, 10, 'command'))
+        self.assertIn(('bump', 1, 'warnings'), self.handle(error))
+
+if __name__ == '__main__':
+    unittest.main()
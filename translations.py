@@ -0,0 +1,83 @@
+import time
+from singleflight import SingleFlight
+from sqlworker import SQLiteWorker
+from wikicache import LRUCache
+
+def normalize(text):
+    """Collapse runs of whitespace, so trivially different texts share an entry."""
+    return ' '.join(text.split())
+
+class TranslationCache:
+    """Translations kept in memory and in SQLite, so they outlive restarts.
+
+    ``translate(lang, text)`` does the real work, returning the
+    translation or None; only successes are cached. The ``maxEntries``
+    most recently used translations stay in memory; older ones are read
+    back from the database on a worker thread, and rows unused for
+    ``maxAge`` seconds are dropped at startup. Identical requests that
+    arrive together share one call to ``translate``.
+    """
+    def __init__(self, translate, path='translations.sqlite3', maxEntries=4096,
+                 maxAge=30 * 86400.0):
+        self.translate = translate
+        #every entry counts as 1, so the budget is a number of entries
+        self.entries = LRUCache(maxEntries)
+        self.flights = SingleFlight()
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.db = SQLiteWorker(path)
+        conn = self.db.conn
+        conn.execute('CREATE TABLE IF NOT EXISTS translations ('
+                     'lang TEXT, source TEXT, result TEXT, used REAL, '
+                     'PRIMARY KEY (lang, source))')
+        conn.execute('DELETE FROM translations WHERE used < ?',
+                     (time.time() - maxAge,))
+        conn.commit()
+
+    def _fetch(self, key):
+        conn = self.db.conn
+        row = conn.execute('SELECT result FROM translations '
+                           'WHERE lang = ? AND source = ?', key).fetchone()
+        if row is not None:
+            conn.execute('UPDATE translations SET used = ? '
+                         'WHERE lang = ? AND source = ?', (time.time(),) + key)
+            conn.commit()
+        return row and row[0]
+
+    def _store(self, key, result):
+        conn = self.db.conn
+        conn.execute('INSERT OR REPLACE INTO translations '
+                     '(lang, source, result, used) VALUES (?, ?, ?, ?)',
+                     key + (result, time.time()))
+        conn.commit()
+
+    async def _load(self, key):
+        result = await self.db.run(self._fetch, key)
+        if result is not None:
+            self.diskHits += 1
+        else:
+            self.misses += 1
+            result = await self.translate(*key)
+            if result is None:
+                return None
+            #written in the background; the single worker keeps writes in order
+            self.db.run(self._store, key, result)
+        self.entries.put(key, result, 1)
+        return result
+
+    async def get(self, lang, text):
+        """``text`` translated into ``lang``, or None if that failed."""
+        key = (lang, normalize(text))
+        cached = self.entries.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached[0]
+        return await self.flights.run(key, self._load, key)
+
+    def summary(self):
+        return 'Translations: {} memory hits, {} disk hits, {} misses, {} in memory'.format(
+            self.hits, self.diskHits, self.misses, len(self.entries.items))
+
+    def close(self):
+        self.db.close()
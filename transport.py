@@ -0,0 +1,133 @@
+import asyncio
+import random
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+from aiohttp import ClientSession, ClientTimeout, ClientError, TCPConnector
+from metrics import METRICS
+
+Response = namedtuple('Response', 'status text')
+
+class CircuitOpen(ClientError):
+    """Raised without trying when a host has been failing."""
+
+class ServerError(ClientError):
+    """Raised when a host still answers 5xx or 429 after every retry."""
+    def __init__(self, host, status):
+        self.host = host
+        self.status = status
+        super().__init__('{} answered {}'.format(host, status))
+
+class Breaker:
+    """Fails fast for ``cooldown`` seconds after ``threshold`` failures in a row.
+
+    Once the cooldown is over, one request is let through to test the
+    host; the circuit closes again if it succeeds.
+    """
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.openUntil = 0
+        self.probing = False
+
+    def allow(self):
+        if self.failures < self.threshold:
+            return True
+        if self.probing or time.monotonic() < self.openUntil:
+            return False
+        self.probing = True
+        return True
+
+    def succeeded(self):
+        self.failures = 0
+        self.probing = False
+
+    def failed(self):
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.threshold:
+            self.openUntil = time.monotonic() + self.cooldown
+
+class Transport:
+    """The one HTTP session for every upstream API.
+
+    The session is opened on first use and kept until close(), with a
+    bounded connection pool and cached DNS. Each host gets at most
+    ``perHost`` requests in flight and its own circuit breaker; failed
+    requests are retried ``retries`` times with jittered exponential
+    backoff starting at ``backoff`` seconds.
+    """
+    def __init__(self, limit=64, perHost=8, timeout=ClientTimeout(total=15, connect=5),
+                 retries=2, backoff=0.5, dnsTTL=300, threshold=5, cooldown=30.0):
+        self.limit = limit
+        self.perHost = perHost
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.dnsTTL = dnsTTL
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.session = None
+        self.slots = {}
+        self.breakers = {}
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            self.session = ClientSession(
+                connector=TCPConnector(limit=self.limit, limit_per_host=self.perHost,
+                                       ttl_dns_cache=self.dnsTTL),
+                timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _attempt(self, host, url, params, timeout):
+        slot = self.slots.get(host)
+        if slot is None:
+            slot = self.slots[host] = asyncio.Semaphore(self.perHost)
+        async with slot:
+            async with METRICS.upstream(host):
+                async with self._session().get(url, params=params, timeout=timeout or self.timeout) as resp:
+                    if resp.status >= 500 or resp.status == 429:
+                        raise ServerError(host, resp.status)
+                    return Response(resp.status, await resp.text())
+
+    async def get(self, url, params=None, timeout=None):
+        """GET ``url`` and return its Response; 4xx statuses are returned too.
+
+        Raises CircuitOpen if the host is known to be down, or the last
+        error once the retries are used up.
+        """
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = Breaker(self.threshold, self.cooldown)
+        if not breaker.allow():
+            raise CircuitOpen('{} is failing; not trying it for now'.format(host))
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                try:
+                    resp = await self._attempt(host, url, params, timeout)
+                except (ClientError, asyncio.TimeoutError) as exc:
+                    error = exc
+                else:
+                    breaker.succeeded()
+                    return resp
+        except asyncio.CancelledError:
+            #the caller gave up; that says nothing about the host
+            breaker.probing = False
+            raise
+        except Exception:
+            #anything unexpected counts against the host, and ends a probe
+            breaker.failed()
+            raise
+        breaker.failed()
+        raise error
+
+TRANSPORT = Transport()
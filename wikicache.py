@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import OrderedDict
+from singleflight import SingleFlight
+
+class LRUCache:
+    """Least-recently-used cache bounded by the total ``size`` of its values."""
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.items = OrderedDict()
+
+    def get(self, key):
+        """Return ``(value, storedAt)`` or None."""
+        item = self.items.get(key)
+        if item is None:
+            return None
+        self.items.move_to_end(key)
+        return item[0], item[2]
+
+    def put(self, key, value, size):
+        self.pop(key)
+        if size > self.budget:
+            return
+        self.items[key] = (value, size, time.time())
+        self.used += size
+        while self.used > self.budget:
+            _, (_, oldsize, _) = self.items.popitem(last=False)
+            self.used -= oldsize
+
+    def touch(self, key):
+        item = self.items.get(key)
+        if item is not None:
+            self.items[key] = (item[0], item[1], time.time())
+            self.items.move_to_end(key)
+
+    def pop(self, key):
+        item = self.items.pop(key, None)
+        if item is not None:
+            self.used -= item[1]
+
+class RevisionCache:
+    """Page (or section) wikitext cached together with its revision ID.
+
+    Content younger than ``fresh`` seconds is served as is. Content up to
+    ``stale`` seconds old is served immediately while a background
+    ``prop=info`` request checks the page's latest revision; anything
+    older is checked before it is served. The full text is only
+    downloaded again when the revision has actually changed.
+    """
+    def __init__(self, req, fresh=60, stale=3600, budget=16 * 1024 * 1024):
+        self.req = req
+        self.fresh = fresh
+        self.stale = stale
+        self.pages = LRUCache(budget)
+        self.flights = SingleFlight()
+
+    async def lastrevid(self, title):
+        info = await self.req({
+            'action': 'query',
+            'prop': 'info',
+            'titles': title,
+        })
+        return list(info['query']['pages'].values())[0].get('lastrevid')
+
+    async def fetch(self, title, section=None):
+        params = {
+            'action': 'query',
+            'prop': 'revisions',
+            'titles': title,
+            'rvlimit': '1',
+            'rvprop': 'ids|content',
+        }
+        if section is not None:
+            params['rvsection'] = section
+        content = await self.req(params)
+        rev = list(content['query']['pages'].values())[0]['revisions'][0]
+        return rev['revid'], rev['*']
+
+    async def _revalidate(self, key):
+        cached = self.pages.get(key)
+        if cached is not None:
+            revid, text = cached[0]
+            if await self.lastrevid(key[0]) == revid:
+                self.pages.touch(key)
+                return text
+        revid, text = await self.fetch(*key)
+        self.pages.put(key, (revid, text), len(text))
+        return text
+
+    def revalidate(self, key):
+        """Start (or join) the single in-flight revalidation of ``key``."""
+        return self.flights.start(key, self._revalidate, key)
+
+    async def content(self, title, section=None):
+        """Return the wikitext of ``title``, or only of section number ``section``."""
+        key = (title, section)
+        cached = self.pages.get(key)
+        if cached is None:
+            return await asyncio.shield(self.revalidate(key))
+        (_, text), storedAt = cached
+        age = time.time() - storedAt
+        if age > self.stale:
+            return await asyncio.shield(self.revalidate(key))
+        if age > self.fresh:
+            self.revalidate(key)
+        return text